@@ -0,0 +1,214 @@
+"""
+Headless batch conversion.
+
+Runs every image, PDF and DOCX found in a set of directories or glob
+patterns through OCR, preprocess_text and TTS, writing for each input:
+
+    <name>.txt            cleaned text
+    <name>.mp3 / .wav     speech
+    <name>.timings.json   word timings
+    <name>.done.json      marker: input hash, settings and outputs
+
+<name> is the input's path relative to its directory (or the glob
+pattern's fixed leading directories), with '__' for path separators,
+then '__' and a short hash of its absolute path: inputs from different
+sources with the same relative path never share outputs, and an input's
+name doesn't depend on which other files are found.
+
+Every artifact is written to a temp file and renamed into place, and the
+done marker is written last. An input whose marker matches its current
+content hash and settings is skipped, so an interrupted run picks up
+where it stopped when started again.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from config.config import BATCH_WORKERS
+from ocr_module.ocr_cache import file_sha256
+from ocr_module.ocr_module import image_path_to_text, pdf_to_text, docx_to_text
+from preprocessing_module.preprocessing_module import preprocess_text
+from tts_module.backends import warm_backends
+from tts_module.tts_module import get_tts_artifact
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff'}
+SUPPORTED_EXTENSIONS = IMAGE_EXTENSIONS | {'pdf', 'docx'}
+DONE_SUFFIX = '.done.json'
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower().lstrip('.')
+
+
+def _glob_base(pattern):
+    """The leading directories of a glob pattern that contain no wildcards"""
+    fixed = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if any(c in part for c in '*?['):
+            break
+        fixed.append(part)
+    return os.sep.join(fixed) or os.curdir
+
+
+def output_stem(path, relative_path):
+    """Output name for the input at path: e.g. scans__page1.png__1a2b3c4d"""
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    return f"{relative_path.replace(os.sep, '__')}__{digest}"
+
+
+def find_inputs(sources):
+    """
+    (path, output stem) for every supported file in the given directories
+    (searched recursively) and glob patterns, sorted by path. See output_stem.
+    """
+    found = {}
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in files:
+                    path = os.path.join(root, name)
+                    if _extension(path) in SUPPORTED_EXTENSIONS:
+                        found[os.path.abspath(path)] = os.path.relpath(path, source)
+        else:
+            base = _glob_base(source)
+            for path in glob.glob(source, recursive=True):
+                if os.path.isfile(path) and _extension(path) in SUPPORTED_EXTENSIONS:
+                    found[os.path.abspath(path)] = os.path.relpath(path, base)
+
+    # The extension stays in the stem, so report.pdf and report.docx don't collide
+    return [(path, output_stem(path, found[path])) for path in sorted(found)]
+
+
+def extract_text(path, handwriting=False):
+    """Raw text of an image, PDF or DOCX file"""
+    ext = _extension(path)
+    if ext in IMAGE_EXTENSIONS:
+        return image_path_to_text(path, use_easyocr=handwriting)
+    if ext == 'pdf':
+        return pdf_to_text(path, use_easyocr=handwriting)
+    if ext == 'docx':
+        return docx_to_text(path)
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _copy_atomic(src, path):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_done_marker(out_dir, stem):
+    """The done marker for stem, or None"""
+    try:
+        with open(os.path.join(out_dir, stem + DONE_SUFFIX), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_done(marker, sha256, settings, out_dir):
+    """True if marker records this exact input and settings and all its outputs still exist"""
+    return (marker is not None
+            and marker.get('sha256') == sha256
+            and marker.get('settings') == settings
+            and all(os.path.exists(os.path.join(out_dir, name)) for name in marker.get('outputs', {}).values()))
+
+
+def convert_file(path, stem, out_dir, settings):
+    """
+    Convert one input. Returns {'source', 'status': 'done'|'skipped'|'error', 'seconds', ...}.
+    """
+    started = time.time()
+    result = {'source': path, 'stem': stem}
+    try:
+        sha256 = file_sha256(path)
+        if is_done(load_done_marker(out_dir, stem), sha256, settings, out_dir):
+            result['status'] = 'skipped'
+            return result
+
+        text = preprocess_text(extract_text(path, settings['handwriting']))
+        if not text.strip():
+            raise ValueError('No text found')
+
+        outputs = {'text': stem + '.txt'}
+        _write_atomic(os.path.join(out_dir, outputs['text']), lambda f: f.write(text))
+
+        if settings['audio']:
+            artifact = get_tts_artifact(text, settings['voice'], settings['rate'])
+            outputs['audio'] = f"{stem}.{artifact['format']}"
+            outputs['timings'] = stem + '.timings.json'
+            _copy_atomic(artifact['audio_path'], os.path.join(out_dir, outputs['audio']))
+            _write_atomic(os.path.join(out_dir, outputs['timings']),
+                          lambda f: json.dump(artifact['timings'], f))
+
+        marker = {
+            'source': path,
+            'sha256': sha256,
+            'settings': settings,
+            'outputs': outputs,
+            'characters': len(text),
+            'finished_at': datetime.now().isoformat(),
+        }
+        _write_atomic(os.path.join(out_dir, stem + DONE_SUFFIX), lambda f: json.dump(marker, f, indent=2))
+        result['status'] = 'done'
+    except Exception as e:
+        result['status'] = 'error'
+        result['message'] = str(e)
+    finally:
+        result['seconds'] = time.time() - started
+    return result
+
+
+def run_batch(sources, out_dir, workers=BATCH_WORKERS, voice='en-US-AriaNeural', rate='+0%',
+              audio=True, handwriting=False):
+    """
+    Convert everything matched by sources into out_dir with `workers`
+    documents in flight. Returns the per-input results.
+    """
+    inputs = find_inputs(sources)
+    os.makedirs(out_dir, exist_ok=True)
+    settings = {'voice': voice, 'rate': rate, 'audio': audio, 'handwriting': handwriting}
+    print(f"[BATCH] {len(inputs)} input files -> {out_dir} ({workers} workers)")
+    if audio:
+        warm_backends()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(convert_file, path, stem, out_dir, settings) for path, stem in inputs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            line = f"[BATCH] ({len(results)}/{len(inputs)}) {result['status']}: {result['source']}"
+            if result['status'] == 'error':
+                line += f" - {result['message']}"
+            elif result['status'] == 'done':
+                line += f" ({result['seconds']:.1f}s)"
+            print(line)
+
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ('done', 'skipped', 'error')}
+    print(f"[BATCH] Finished: {counts['done']} converted, {counts['skipped']} already done, "
+          f"{counts['error']} failed")
+    return results
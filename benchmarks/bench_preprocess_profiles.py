@@ -0,0 +1,123 @@
+"""
+Benchmark for the OCR image preprocessing profiles.
+
+For sample.pdf (reference: its embedded text layer) and sample2.jpg
+(reference: benchmarks/data/sample2.txt), runs every profile and reports
+preprocessing and OCR time per page and character accuracy of the
+Tesseract output against the reference. --noise adds Gaussian noise to
+the inputs to exercise the denoising paths.
+
+Run from the project root:
+    python -m benchmarks.bench_preprocess_profiles
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from pdf2image import convert_from_path
+
+from config.config import PROJECT_ROOT, POPPLER_PATH
+from ocr_module.ocr_module import (PDF_DPI, PREPROCESS_PROFILES, extract_text_layer, load_gray_image,
+                                   preprocess_image_for_ocr, to_grayscale)
+from ocr_module.tesseract_engine import engine_available, recognize
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def normalize(text):
+    return ' '.join(text.split())
+
+
+def edit_distance(a, b):
+    """Levenshtein distance, one NumPy row at a time"""
+    if not a or not b:
+        return len(a) + len(b)
+    b_codes = np.frombuffer(b.encode('utf-32-le'), dtype=np.uint32)
+    cols = np.arange(len(b) + 1)
+    row = cols.copy()
+    for i, ch in enumerate(a, start=1):
+        substitute = row[:-1] + (b_codes != ord(ch))
+        best = np.minimum(row[1:] + 1, substitute)
+        best = np.concatenate(([i], best))
+        # Insertions chain along the row: row[j] = min_k(best[k] + j - k)
+        row = np.minimum.accumulate(best - cols) + cols
+    return int(row[-1])
+
+
+def char_accuracy(text, reference):
+    """1 - normalized edit distance, on whitespace-normalized text"""
+    text, reference = normalize(text), normalize(reference)
+    if not reference:
+        return 1.0 if not text else 0.0
+    return max(0.0, 1.0 - edit_distance(text, reference) / len(reference))
+
+
+def load_samples():
+    """[(name, grey page array, reference text)]"""
+    samples = []
+    pdf_path = os.path.join(PROJECT_ROOT, 'sample.pdf')
+    layer = extract_text_layer(pdf_path)
+    if layer is None:
+        print("sample.pdf skipped: poppler (pdftotext/pdftoppm) is not available")
+    else:
+        pages = convert_from_path(pdf_path, poppler_path=POPPLER_PATH, dpi=PDF_DPI)
+        for number, (page, reference) in enumerate(zip(pages, layer), start=1):
+            samples.append((f"sample.pdf p{number}", to_grayscale(page), reference))
+
+    with open(os.path.join(DATA_DIR, 'sample2.txt'), 'r', encoding='utf-8') as f:
+        samples.append(('sample2.jpg', load_gray_image(os.path.join(PROJECT_ROOT, 'sample2.jpg')), f.read()))
+    return samples
+
+
+def add_noise(gray, sigma, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(gray + rng.normal(0, sigma, gray.shape), 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=list(PREPROCESS_PROFILES), choices=PREPROCESS_PROFILES)
+    parser.add_argument("--noise", type=float, default=0.0, help="Gaussian noise sigma added to every input")
+    parser.add_argument("--repeat", type=int, default=3, help="preprocessing runs per page (best is kept)")
+    args = parser.parse_args()
+
+    samples = load_samples()
+    if args.noise:
+        samples = [(name, add_noise(gray, args.noise), ref) for name, gray, ref in samples]
+    ocr = engine_available()
+    if not ocr:
+        print("Tesseract is not available: reporting preprocessing time only")
+
+    print(f"{'profile':>9} {'input':>16} {'pixels':>10} {'prep ms':>9} {'ocr ms':>9} {'accuracy':>9}")
+    for profile in args.profiles:
+        totals = {'prep': 0.0, 'ocr': 0.0, 'accuracy': 0.0}
+        for name, gray, reference in samples:
+            prep = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                processed = preprocess_image_for_ocr(gray, profile=profile)
+                prep = min(prep, time.perf_counter() - start)
+
+            ocr_ms, accuracy = "-", "-"
+            if ocr:
+                start = time.perf_counter()
+                text = recognize(processed)
+                elapsed = time.perf_counter() - start
+                score = char_accuracy(text, reference)
+                totals['ocr'] += elapsed
+                totals['accuracy'] += score
+                ocr_ms, accuracy = f"{elapsed * 1000:.0f}", f"{score:.3f}"
+            totals['prep'] += prep
+            print(f"{profile:>9} {name:>16} {gray.size:>10} {prep * 1000:>9.1f} {ocr_ms:>9} {accuracy:>9}")
+
+        n = len(samples)
+        summary_ocr = f"{totals['ocr'] / n * 1000:.0f}" if ocr else "-"
+        summary_acc = f"{totals['accuracy'] / n:.3f}" if ocr else "-"
+        print(f"{profile:>9} {'mean per page':>16} {'':>10} {totals['prep'] / n * 1000:>9.1f} "
+              f"{summary_ocr:>9} {summary_acc:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for preprocess_text.
+
+Builds synthetic OCR output of increasing size (up to 500 pages) and a
+correction list of a few thousand entries, then times the single-pass
+engine against the previous replace-loop implementation.
+
+Run from the project root:
+    python -m benchmarks.bench_preprocessing
+"""
+
+import argparse
+import random
+import time
+
+from preprocessing_module.preprocessing_module import (
+    default_corrections, get_correction_engine, preprocess_text)
+
+WORDS_PER_PAGE = 350
+VOCABULARY = (
+    "the reading assistant converts printed pages into speech for students "
+    "with dyslexia using optical character recognition and neural voices "
+    "data system computer information communication within with abstract"
+).split()
+
+
+def make_text(pages, seed=0):
+    """Synthetic OCR output sprinkled with known misreadings and ragged whitespace"""
+    rng = random.Random(seed)
+    misreads = list(default_corrections())
+    out = []
+    for page in range(1, pages + 1):
+        out.append(f"\n--- Page {page} ---\n")
+        for i in range(WORDS_PER_PAGE):
+            word = rng.choice(misreads) if rng.random() < 0.05 else rng.choice(VOCABULARY)
+            out.append(word)
+            out.append("    " if i % 40 == 39 else ("\n\n\n\n\n" if i % 120 == 119 else " "))
+    return "".join(out)
+
+
+def make_corrections(count, seed=0):
+    """Random misread -> correction pairs to bulk up the dictionary"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return {"".join(rng.choice(letters) for _ in range(rng.randint(5, 10))) + "q": "x"
+            for _ in range(count)}
+
+
+def legacy_preprocess_text(text, corrections):
+    """The replace-loop implementation preprocess_text used to have"""
+    for wrong, correct in corrections.items():
+        text = text.replace(wrong, correct)
+    text = text.replace("\r\n", "\n")
+    text = text.replace("\r", "\n")
+    while "   " in text:
+        text = text.replace("   ", " ")
+    while "\n\n\n\n" in text:
+        text = text.replace("\n\n\n\n", "\n\n")
+    return text.strip()
+
+
+def time_call(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--corrections", type=int, default=5000,
+                        help="extra synthetic corrections added to the shipped list")
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="don't time the old replace-loop implementation")
+    args = parser.parse_args()
+
+    extra = make_corrections(args.corrections)
+    corrections = dict(default_corrections())
+    corrections.update(extra)
+    get_correction_engine(extra)  # build the engine outside the timed region
+
+    print(f"{len(corrections)} corrections, {WORDS_PER_PAGE} words/page")
+    print(f"{'pages':>6} {'chars':>10} {'engine s':>10} {'ms/page':>8} {'legacy s':>10}")
+    for pages in args.pages:
+        text = make_text(pages)
+        new = time_call(preprocess_text, text, extra)
+        legacy = "-" if args.skip_legacy else f"{time_call(legacy_preprocess_text, text, corrections, repeat=1):10.3f}"
+        print(f"{pages:>6} {len(text):>10} {new:>10.3f} {new / pages * 1000:>8.2f} {legacy:>10}")
+
+
+if __name__ == "__main__":
+    main()
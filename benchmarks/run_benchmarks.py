@@ -0,0 +1,351 @@
+"""
+End-to-end pipeline benchmark suite with regression tracking.
+
+Runs the real pipeline stages on the repository's sample files:
+
+    docx         docx_to_text(sample.docx)
+    image_png    image_path_to_text(sample.png)
+    image_jpg    image_path_to_text(sample2.jpg)
+    pdf          pdf_to_text(sample.pdf)
+    preprocess   preprocess_text on ~100 pages of synthetic OCR output
+    store        JSON store migration into a fresh SQLite database, then
+                 document saves and loads
+    tts_cold     get_tts_artifact on an empty audio cache: local stand-in
+                 backend, word alignment and the cache write
+    tts_warm     get_tts_artifact served from the audio cache
+
+Each stage runs in its own subprocess (so peak RSS belongs to that stage
+alone and no stage warms another's caches), --repeat times, with the OCR
+cache disabled. For every stage the median wall time, median CPU time
+(the stage process plus any children it reaped) and peak RSS are
+written to a JSON results file. With --baseline, results are compared
+against a stored run and the exit status is 1 if any stage got slower
+or bigger by more than --threshold.
+
+Run from the project root:
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --threshold 0.2
+
+benchmarks/baseline.json is checked in; its "command" and "platform"
+fields record how and where it was produced.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is not reported
+    resource = None
+
+from config.config import PROJECT_ROOT
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+STAGE_TIMEOUT_SECONDS = 1800
+# Differences below these are noise, whatever the relative change
+MIN_TIME_DELTA_SECONDS = 0.005
+MIN_RSS_DELTA_MB = 5.0
+COMPARED_METRICS = ('wall_s', 'cpu_s', 'peak_rss_mb')
+STORE_DOCUMENTS = 100
+PREPROCESS_PAGES = 100
+TTS_PAGES = 2
+
+
+def _sample(name):
+    return os.path.join(PROJECT_ROOT, name)
+
+
+# Each stage does its setup and returns the function to time, which
+# returns the size of what it produced (0 means the stage failed)
+
+def stage_docx():
+    from ocr_module.ocr_module import docx_to_text
+    return lambda: len(docx_to_text(_sample('sample.docx')))
+
+
+def stage_image_png():
+    from ocr_module.ocr_module import image_path_to_text
+    return lambda: len(image_path_to_text(_sample('sample.png'), use_cache=False).strip())
+
+
+def stage_image_jpg():
+    from ocr_module.ocr_module import image_path_to_text
+    return lambda: len(image_path_to_text(_sample('sample2.jpg'), use_cache=False).strip())
+
+
+def stage_pdf():
+    from ocr_module.ocr_module import pdf_to_text
+    # pdf_to_text returns "" on failure; page headers alone don't count as output
+    return lambda: len(pdf_to_text(_sample('sample.pdf'), use_cache=False).replace('--- Page', '').strip())
+
+
+def stage_preprocess():
+    from benchmarks.bench_preprocessing import make_text
+    from preprocessing_module.preprocessing_module import get_correction_engine, preprocess_text
+    text = make_text(PREPROCESS_PAGES)
+    get_correction_engine()  # build the correction engine outside the timed region
+    return lambda: len(preprocess_text(text))
+
+
+def stage_store():
+    from config.config import DOCUMENTS_JSON_FILE, USERS_JSON_FILE
+    from storage_module import storage_module as store
+    from benchmarks.bench_preprocessing import make_text
+    texts = [make_text(1, seed=i) for i in range(STORE_DOCUMENTS)]
+
+    def run():
+        tmp_dir = tempfile.mkdtemp(prefix='bench_store_')
+        try:
+            # A fresh database imports the JSON store, then documents are saved and read back
+            store.init_db(os.path.join(tmp_dir, 'bench.db'), USERS_JSON_FILE, DOCUMENTS_JSON_FILE)
+            ids = [store.add_document('bench@example.com', f"doc {i}", text) for i, text in enumerate(texts)]
+            listed = store.list_documents('bench@example.com')
+            loaded = sum(len(store.get_document('bench@example.com', doc_id)['text']) for doc_id in ids)
+            store.get_connection().close()
+            return loaded if len(listed) == len(ids) else 0
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return run
+
+
+TTS_VOICE = 'en-US-AriaNeural'
+TTS_RATE = '+0%'
+
+
+def _tts_text():
+    from benchmarks.bench_preprocessing import make_text
+    from preprocessing_module.preprocessing_module import preprocess_text
+    from tts_module import backends
+    # Time the offline stand-in rather than the network or the system voice
+    backends.TTS_BACKENDS = ['local']
+    return preprocess_text(make_text(TTS_PAGES))
+
+
+def _tts_artifact_size(text, cache_dir):
+    """get_tts_artifact(text) with the process's audio cache in cache_dir"""
+    from tts_module import audio_cache
+    from tts_module.tts_module import get_tts_artifact
+    audio_cache._cache = audio_cache.AudioCache(cache_dir)
+    artifact = get_tts_artifact(text, TTS_VOICE, TTS_RATE)
+    return os.path.getsize(artifact['audio_path']) if artifact['timings'] else 0
+
+
+def stage_tts_cold():
+    text = _tts_text()
+
+    def run():
+        tmp_dir = tempfile.mkdtemp(prefix='bench_tts_')
+        try:
+            return _tts_artifact_size(text, tmp_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return run
+
+
+def stage_tts_warm():
+    text = _tts_text()
+    tmp_dir = tempfile.mkdtemp(prefix='bench_tts_')
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    _tts_artifact_size(text, tmp_dir)
+    return lambda: _tts_artifact_size(text, tmp_dir)
+
+
+STAGES = {
+    'docx': stage_docx,
+    'image_png': stage_image_png,
+    'image_jpg': stage_image_jpg,
+    'pdf': stage_pdf,
+    'preprocess': stage_preprocess,
+    'store': stage_store,
+    'tts_cold': stage_tts_cold,
+    'tts_warm': stage_tts_warm,
+}
+
+
+def _cpu_seconds():
+    if resource is None:
+        return time.process_time()
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure_stage(name, repeat):
+    """Run one stage in this process and return its measurements"""
+    run = STAGES[name]()
+    walls, cpus, output = [], [], 0
+    for _ in range(repeat):
+        cpu_start, wall_start = _cpu_seconds(), time.perf_counter()
+        output = run()
+        walls.append(time.perf_counter() - wall_start)
+        cpus.append(_cpu_seconds() - cpu_start)
+        if not output:
+            raise RuntimeError("stage produced no output")
+    return {
+        'status': 'ok',
+        'runs': repeat,
+        'wall_s': statistics.median(walls),
+        'wall_min_s': min(walls),
+        'first_wall_s': walls[0],
+        'cpu_s': statistics.median(cpus),
+        'peak_rss_mb': _peak_rss_mb(),
+        'output_size': output,
+    }
+
+
+def run_stage_subprocess(name, repeat):
+    """Measure a stage in a fresh interpreter; failures are reported, not raised"""
+    fd, result_path = tempfile.mkstemp(prefix=f'bench_{name}_', suffix='.json')
+    os.close(fd)
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run_benchmarks', '--child', name,
+             '--repeat', str(repeat), '--result-file', result_path],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=STAGE_TIMEOUT_SECONDS)
+        with open(result_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if proc.returncode == 0 and content:
+            return json.loads(content)
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return {'status': 'error', 'message': lines[-1] if lines else f"exit code {proc.returncode}"}
+    except subprocess.TimeoutExpired:
+        return {'status': 'error', 'message': f"timed out after {STAGE_TIMEOUT_SECONDS}s"}
+    finally:
+        os.remove(result_path)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    [(stage, metric, baseline value, new value, relative change)] for every
+    metric that grew by more than threshold (and more than the noise floor)
+    """
+    regressions = []
+    for name, stage in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if stage.get('status') != 'ok' or not base or base.get('status') != 'ok':
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base.get(metric), stage.get(metric)
+            if old is None or new is None:
+                continue
+            floor = MIN_RSS_DELTA_MB if metric == 'peak_rss_mb' else MIN_TIME_DELTA_SECONDS
+            if new - old > max(floor, old * threshold):
+                regressions.append((name, metric, old, new, (new - old) / old if old else float('inf')))
+    return regressions
+
+
+def _format(value, metric):
+    if value is None:
+        return '-'
+    return f"{value:.1f}" if metric == 'peak_rss_mb' else f"{value * 1000:.1f}"
+
+
+def print_table(results, baseline=None):
+    print(f"{'stage':>11} {'wall ms':>10} {'cpu ms':>10} {'rss MB':>8} {'vs base':>9}  status")
+    for name, stage in results['stages'].items():
+        if stage['status'] != 'ok':
+            print(f"{name:>11} {'-':>10} {'-':>10} {'-':>8} {'-':>9}  error: {stage['message']}")
+            continue
+        change = '-'
+        base = (baseline or {}).get('stages', {}).get(name)
+        if base and base.get('status') == 'ok' and base.get('wall_s'):
+            change = f"{(stage['wall_s'] - base['wall_s']) / base['wall_s']:+.0%}"
+        print(f"{name:>11} {_format(stage['wall_s'], 'wall_s'):>10} {_format(stage['cpu_s'], 'cpu_s'):>10} "
+              f"{_format(stage['peak_rss_mb'], 'peak_rss_mb'):>8} {change:>9}  ok")
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (median is reported)")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative growth of wall/CPU time or peak RSS that counts as a regression")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results to PATH as the new baseline")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    repeat = max(1, args.repeat)
+
+    if args.child:
+        _write_json(args.result_file, measure_stage(args.child, repeat))
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'command': ' '.join(['python -m benchmarks.run_benchmarks'] + sys.argv[1:]),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'stages': {},
+    }
+    for name in args.stages:
+        print(f"[BENCH] {name}...", flush=True)
+        results['stages'][name] = run_stage_subprocess(name, repeat)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    _write_json(output, results)
+    if args.save_baseline:
+        _write_json(args.save_baseline, results)
+
+    print_table(results, baseline)
+    print(f"[BENCH] Results written to {output}")
+    if baseline is None:
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, old, new, change in regressions:
+        unit = 'MB' if metric == 'peak_rss_mb' else 'ms'
+        print(f"[BENCH] REGRESSION {name} {metric}: {_format(old, metric)} -> {_format(new, metric)} {unit} "
+              f"({change:+.0%}, threshold {args.threshold:.0%})")
+    if regressions:
+        return 1
+    print(f"[BENCH] No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,111 @@
+import os
 import platform
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe" if platform.system() == "Windows" else "tesseract"
 
 POPPLER_PATH = r"C:\Users\User\OneDrive\Desktop\ReadingAssistantProject2\ocr_module\poppler-25.07.0\Library\bin" if platform.system() == "Windows" else None
 
 PROFILE_FILE = "user_profile.json"
-AUDIO_FILE = "output.mp3"
\ No newline at end of file
+AUDIO_FILE = "output.mp3"
+
+# OCR result cache (content hash + OCR settings -> per-page text)
+OCR_CACHE_DIR = os.path.join(PROJECT_ROOT, "cache", "ocr")
+OCR_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Parallel PDF OCR: pages are farmed out to a process pool of this size (1 = serial)
+OCR_WORKERS = min(8, os.cpu_count() or 1)
+# Pages rasterized and handed to Tesseract together (one pool task / tesseract run per batch)
+OCR_BATCH_PAGES = 4
+
+# Upload OCR jobs run in the background; at most this many documents are OCRed at once
+OCR_MAX_CONCURRENT_JOBS = 2
+OCR_JOB_TTL_SECONDS = 60 * 60
+
+# Image preprocessing before Tesseract: "fast", "balanced" or "quality"
+# (python -m benchmarks.bench_preprocess_profiles compares them)
+OCR_PREPROCESS_PROFILE = "balanced"
+
+# Rasterize PDF pages / downscale photos so the text is about OCR_TARGET_TEXT_HEIGHT px tall
+# (measured on a cheap low-resolution pass) instead of always using 300 dpi / full resolution
+OCR_ADAPTIVE_RESOLUTION = True
+OCR_TARGET_TEXT_HEIGHT = 24
+
+# Find text blocks on a cheap pre-pass and only preprocess/OCR those (Tesseract);
+# blank pages, margins and figures are skipped
+OCR_TEXT_REGIONS = True
+
+# PDF pages whose embedded text layer has at least this many letters/digits skip OCR
+PDF_TEXT_LAYER_MIN_CHARS = 20
+
+# Load the EasyOCR (handwriting) model in the background at startup instead of on first use
+EASYOCR_PRELOAD = False
+
+# Directory of <misread>\t<correction> files loaded by preprocess_text
+OCR_CORRECTIONS_DIR = os.path.join(PROJECT_ROOT, "preprocessing_module", "data")
+
+# SQLite store for users and documents (the JSON files are migrated into it once)
+DB_FILE = os.path.join(PROJECT_ROOT, "reading_assistant.db")
+USERS_JSON_FILE = os.path.join(PROJECT_ROOT, "users_data.json")
+DOCUMENTS_JSON_FILE = os.path.join(PROJECT_ROOT, "documents_data.json")
+
+# Documents shown per page on the upload page
+DOCUMENTS_PAGE_SIZE = 24
+
+# Synthesized audio cache (hash of text + voice + rate + backend -> audio file)
+TTS_CACHE_DIR = os.path.join(PROJECT_ROOT, "cache", "tts")
+TTS_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Long texts are synthesized as concurrent chunks; the first chunk is kept short
+# so playback can start quickly
+TTS_CHUNK_CHARS = 1500
+TTS_FIRST_CHUNK_CHARS = 200
+TTS_MAX_CONCURRENT_CHUNKS = 4
+
+# How long browsers may reuse cached audio before revalidating with the ETag
+AUDIO_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# Edge voice list: cached in memory and on disk, refreshed in the background after the TTL;
+# the shipped snapshot is used until the first successful fetch
+VOICES_CACHE_FILE = os.path.join(PROJECT_ROOT, "cache", "edge_voices.json")
+VOICES_SNAPSHOT_FILE = os.path.join(PROJECT_ROOT, "tts_module", "data", "edge_voices_snapshot.json")
+VOICES_TTL_SECONDS = 24 * 60 * 60
+
+# TTS coroutines run on one long-lived event loop thread; callers wait at most this long
+TTS_SYNTHESIS_TIMEOUT_SECONDS = 300
+TTS_VOICES_TIMEOUT_SECONDS = 15
+
+# TTS backends, tried in order ("edge", "pyttsx3", or "local" - the offline stand-in
+# for benchmarks and tests). A backend that fails TTS_BREAKER_FAILURES times in a row
+# is skipped (circuit open) for TTS_BREAKER_RESET_SECONDS before it is tried again
+TTS_BACKENDS = ["edge", "pyttsx3"]
+TTS_BREAKER_FAILURES = 3
+TTS_BREAKER_RESET_SECONDS = 60
+TTS_EDGE_CHUNK_TIMEOUT_SECONDS = 20
+
+# Offline pyttsx3 synthesis runs in this many pre-initialized worker processes
+TTS_OFFLINE_WORKERS = 2
+TTS_OFFLINE_TIMEOUT_SECONDS = 120
+
+# Local stand-in backend: speaking rate, tones (or silence), artificial latency
+# (fixed + per 1000 characters) and the share of calls that fail, drawn from a seeded RNG
+TTS_LOCAL_WPM = 170
+TTS_LOCAL_TONES = True
+TTS_LOCAL_LATENCY_SECONDS = 0.0
+TTS_LOCAL_LATENCY_PER_1K_CHARS = 0.0
+TTS_LOCAL_FAILURE_RATE = 0.0
+TTS_LOCAL_SEED = 0
+
+# Headless batch conversion (python main.py batch ...): documents converted at once
+BATCH_WORKERS = 2
+
+# Stage metrics (latency histograms, counters) exposed at /metrics in the Prometheus text format
+METRICS_ENABLED = True
+
+# Request profiling (cProfile + tracemalloc, written to PROFILE_DIR): every request when
+# PROFILE_REQUESTS is on, otherwise only requests with an "X-Profile: 1" header from a
+# user in PROFILE_ADMIN_EMAILS. Slows profiled requests down considerably.
+PROFILE_REQUESTS = False
+PROFILE_ADMIN_EMAILS = []
+PROFILE_DIR = os.path.join(PROJECT_ROOT, "cache", "profiles")
@@ -1,8 +1,12 @@
 """
 Reading Assistant - Main Entry Point
-Launches the web-based UI with all integrated modules
+Launches the web-based UI with all integrated modules, or converts
+documents headlessly:
+
+    python main.py batch <dir|glob>... --out DIR [--workers N]
 """
 
+import argparse
 import sys
 import os
 
@@ -39,8 +43,8 @@ def main():
         print(f"\n❌ ERROR: Could not import required modules")
         print(f"   Details: {str(e)}")
         print("\n   Make sure you have installed all dependencies:")
-        print("   pip install flask edge-tts pyttsx3 pygame Pillow pdf2image python-docx opencv-python pytesseract")
-        print("\n   Optional: pip install easyocr")
+        print("   pip install flask edge-tts pyttsx3 pygame Pillow pdf2image python-docx opencv-python")
+        print("\n   Optional: pip install easyocr tesserocr")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
@@ -49,5 +53,31 @@ def main():
         sys.exit(1)
 
 
+def batch_main(argv):
+    """Headless batch conversion entry point"""
+    from config.config import BATCH_WORKERS
+
+    parser = argparse.ArgumentParser(prog='main.py batch',
+                                     description='Convert images, PDFs and DOCX files to text, audio and word timings')
+    parser.add_argument('inputs', nargs='+', help='directories (searched recursively) or glob patterns')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='documents converted at once')
+    parser.add_argument('--voice', default='en-US-AriaNeural', help='TTS voice')
+    parser.add_argument('--speed', type=float, default=1.0, help='speech speed multiplier (0.5 - 2.0)')
+    parser.add_argument('--no-audio', action='store_true', help='only write the text')
+    parser.add_argument('--handwriting', action='store_true', help='OCR with EasyOCR')
+    args = parser.parse_args(argv)
+
+    from batch_module.batch_module import run_batch
+
+    # Same conversion as the web reader: 1.0 = +0%, 0.5 = -50%, 2.0 = +100%
+    rate = f"{int((args.speed - 1.0) * 100):+d}%"
+    results = run_batch(args.inputs, args.out, workers=args.workers, voice=args.voice, rate=rate,
+                        audio=not args.no_audio, handwriting=args.handwriting)
+    return 1 if any(r['status'] == 'error' for r in results) else 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(batch_main(sys.argv[2:]))
     main()
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Page layout pre-pass: blank-page and text-block detection.
+
+On a reduced copy of the page, character-shaped connected components are
+found (see resolution.glyph_components) and smeared together into lines.
+Text sits on baselines, so lines where too few components end at the same
+height as their neighbour are dropped, which removes figures, photos and
+scanner dirt; the remaining components are smeared into blocks. A page
+with no block left is blank. Only the block rectangles are preprocessed
+and OCRed, so margins, figures and blank separator pages cost nothing
+beyond this pass.
+"""
+
+import cv2
+import numpy as np
+
+from ocr_module.resolution import glyph_components, typical_height
+
+# Layout is analysed on a copy whose longest side is at most this many pixels
+ANALYSIS_MAX_SIDE = 1000
+# A page with fewer character-shaped components than this is blank
+MIN_PAGE_GLYPHS = 5
+MIN_BLOCK_GLYPHS = 2
+# Share of a line's (and a block's) components that must sit on a shared
+# baseline: bottoms within BASELINE_TOLERANCE text heights of their neighbour's
+MIN_ALIGNED_SHARE = 0.4
+BASELINE_TOLERANCE = 0.2
+# Smearing (in text heights): across word gaps, and down to the next line
+JOIN_WIDTH = 1.5
+JOIN_HEIGHT = 1.0
+# Blocks are cut out with this much margin (in text heights)
+PADDING = 0.5
+
+
+def _box_mask(shape, glyphs):
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    for x, y, w, h, _ in glyphs:
+        mask[y:y + h, x:x + w] = 255
+    return mask
+
+
+def _labels_at_centres(mask, kernel, glyphs):
+    """Connected components of the dilated mask: (count, stats, label of each glyph's centre)"""
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(cv2.dilate(mask, kernel), connectivity=8)
+    centres_x = glyphs[:, cv2.CC_STAT_LEFT] + glyphs[:, cv2.CC_STAT_WIDTH] // 2
+    centres_y = glyphs[:, cv2.CC_STAT_TOP] + glyphs[:, cv2.CC_STAT_HEIGHT] // 2
+    return count, stats, labels[centres_y, centres_x]
+
+
+def _aligned_shares(group_of, count, aligned):
+    """(glyph count, share of aligned glyphs) of each of count groups"""
+    total = np.bincount(group_of, minlength=count)
+    return total, np.bincount(group_of, weights=aligned, minlength=count) / np.maximum(total, 1)
+
+
+def reading_order(regions):
+    """
+    Sort (x, y, w, h) regions for reading: recursively split the set at its
+    widest clear gap, between rows (above before below) or columns (left
+    before right), so side-by-side columns are read one after the other
+    """
+    if len(regions) <= 1:
+        return list(regions)
+    best = None
+    for axis in (1, 0):
+        spans = sorted((r[axis], r[axis] + r[axis + 2]) for r in regions)
+        reach = spans[0][1]
+        for start, end in spans[1:]:
+            if start > reach and (best is None or start - reach > best[0]):
+                best = (start - reach, axis, start)
+            reach = max(reach, end)
+    if best is None:
+        return sorted(regions, key=lambda r: (r[1], r[0]))
+    _, axis, cut = best
+    return (reading_order([r for r in regions if r[axis] < cut])
+            + reading_order([r for r in regions if r[axis] >= cut]))
+
+
+def find_text_regions(gray):
+    """
+    Text blocks of a greyscale page as (x, y, w, h) tuples in its pixels,
+    in reading order. An empty list means the page is blank.
+    """
+    factor = min(1.0, ANALYSIS_MAX_SIDE / float(max(gray.shape[:2])))
+    small = gray if factor == 1.0 else cv2.resize(gray, None, fx=factor, fy=factor,
+                                                  interpolation=cv2.INTER_AREA)
+    glyphs = glyph_components(small)
+    if len(glyphs) < MIN_PAGE_GLYPHS:
+        return []
+    text_height = typical_height(glyphs)
+    join_width = int(JOIN_WIDTH * text_height) | 1
+
+    # Lines: is each glyph's neighbour on the line on the same baseline?
+    line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (join_width, 1))
+    line_count, _, line_of = _labels_at_centres(_box_mask(small.shape, glyphs), line_kernel, glyphs)
+    order = np.lexsort((glyphs[:, cv2.CC_STAT_LEFT], line_of))
+    bottom = (glyphs[:, cv2.CC_STAT_TOP] + glyphs[:, cv2.CC_STAT_HEIGHT])[order]
+    paired = ((line_of[order][1:] == line_of[order][:-1])
+              & (np.abs(bottom[1:] - bottom[:-1]) <= max(1.0, BASELINE_TOLERANCE * text_height)))
+    aligned = np.zeros(len(glyphs), dtype=bool)
+    aligned[order[1:]] |= paired
+    aligned[order[:-1]] |= paired
+
+    # Drop lines that aren't text (a lone glyph is left for its block to decide)
+    line_total, line_share = _aligned_shares(line_of, line_count, aligned)
+    text_line = (line_total == 1) | (line_share >= MIN_ALIGNED_SHARE)
+    keep_glyph = text_line[line_of]
+    glyphs, aligned = glyphs[keep_glyph], aligned[keep_glyph]
+    if len(glyphs) < MIN_BLOCK_GLYPHS:
+        return []
+
+    # Blocks: the text lines smeared together
+    block_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (join_width, int(JOIN_HEIGHT * text_height) | 1))
+    block_count, blocks, block_of = _labels_at_centres(_box_mask(small.shape, glyphs), block_kernel, glyphs)
+    block_total, block_share = _aligned_shares(block_of, block_count, aligned)
+    keep = (block_total >= MIN_BLOCK_GLYPHS) & (block_share >= MIN_ALIGNED_SHARE)
+    keep[0] = False  # background
+
+    pad = PADDING * text_height
+    full_h, full_w = gray.shape[:2]
+    regions = []
+    for bx, by, bw, bh, _ in blocks[keep]:
+        left = max(0, int((bx - pad) / factor))
+        top = max(0, int((by - pad) / factor))
+        right = min(full_w, int(np.ceil((bx + bw + pad) / factor)))
+        bottom = min(full_h, int(np.ceil((by + bh + pad) / factor)))
+        regions.append((left, top, right - left, bottom - top))
+    return reading_order(regions)
+
+
+def skipped_area(regions, shape):
+    """Fraction of a page's area outside its text regions"""
+    page = np.zeros(shape[:2], dtype=bool)
+    for x, y, w, h in regions:
+        page[y:y + h, x:x + w] = True
+    return float(1.0 - page.mean()) if page.size else 0.0
+
+
+def crop(image, region):
+    """The region (x, y, w, h) of a PIL image or array"""
+    x, y, w, h = region
+    if isinstance(image, np.ndarray):
+        return image[y:y + h, x:x + w]
+    return image.crop((x, y, x + w, y + h))
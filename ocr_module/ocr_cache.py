@@ -0,0 +1,141 @@
+"""
+On-disk OCR result cache.
+
+Entries are keyed by the SHA-256 of the input file plus every OCR setting
+that can change the output (engine, DPI, preprocessing mode, Tesseract
+config), so re-uploading the same handout skips OCR entirely.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from config.config import OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash a file's contents without loading it all into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    Stores the per-page results of OCRed files as small JSON files.
+    Least recently used entries are evicted once the directory grows
+    past max_bytes (file mtime is bumped on every hit).
+    """
+
+    # Bump when the stored page format changes so stale entries are never read back
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir=OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, path, engine, dpi=None, preprocessing=None, config=None):
+        """Build the cache key for a file and the OCR settings applied to it"""
+        settings = json.dumps({
+            'format': self.FORMAT_VERSION,
+            'sha256': file_sha256(path),
+            'engine': engine,
+            'dpi': dpi,
+            'preprocessing': preprocessing,
+            'config': config,
+        }, sort_keys=True)
+        return hashlib.sha256(settings.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached list of pages, or None on a miss"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                pages = json.load(f)['pages']
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return pages
+
+    def put(self, key, pages):
+        """Store the pages for key and evict old entries if over budget"""
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pages': pages}, f)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"[OCR-CACHE] Could not write cache entry: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Shared cache instance for this process"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRCache()
+    return _cache
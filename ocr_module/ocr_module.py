@@ -1,46 +1,178 @@
-import pytesseract
+import importlib.util
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
 from PIL import Image, ImageEnhance
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import docx
 import cv2
 import numpy as np
-from config.config import TESSERACT_CMD, POPPLER_PATH
-
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-
-# Try to import EasyOCR (optional, for handwriting)
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-    # Initialize reader once (it's slow to initialize)
-    easyocr_reader = easyocr.Reader(['en'], gpu=False)
-except ImportError:
-    EASYOCR_AVAILABLE = False
-    easyocr_reader = None
-
-def preprocess_image_for_ocr(image, for_handwriting=False):
-    """Preprocess image for better OCR results"""
-    if isinstance(image, Image.Image):
-        img_array = np.array(image)
-    else:
-        img_array = image
-    
-    if len(img_array.shape) == 3:
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-    else:
-        gray = img_array
-    
-    if for_handwriting:
-        # Less aggressive preprocessing for handwriting
-        denoised = cv2.fastNlMeansDenoising(gray, None, 5, 7, 21)
-        binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                       cv2.THRESH_BINARY, 15, 5)
+from config.config import (POPPLER_PATH, OCR_WORKERS, OCR_BATCH_PAGES, PDF_TEXT_LAYER_MIN_CHARS,
+                           EASYOCR_PRELOAD, OCR_PREPROCESS_PROFILE, OCR_ADAPTIVE_RESOLUTION, OCR_TEXT_REGIONS)
+from ocr_module.layout import crop, find_text_regions, skipped_area
+from ocr_module.ocr_cache import get_ocr_cache
+from ocr_module.resolution import PROBE_DPI, choose_image_scale, choose_pdf_dpi, downscale
+from ocr_module.tesseract_engine import TESSERACT_CONFIG, recognize_batch
+from metrics_module.metrics_module import counter, histogram
+
+PDF_DPI = 300
+
+PREPROCESS_PROFILES = ('fast', 'balanced', 'quality')
+# Below this estimated noise level (grey levels) fast/balanced skip denoising
+CLEAN_NOISE_SIGMA = 2.0
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+# Smallest window for the background estimate; must be wider than a pen stroke
+BACKGROUND_KERNEL_MIN = 31
+PDFTOTEXT_TIMEOUT = 120
+
+# Metrics (see metrics_module). Stages: text_layer per PDF; render per batch of
+# pages; layout and preprocess per page; recognize per Tesseract batch (per page for EasyOCR)
+OCR_DOCUMENT_SECONDS = histogram('ocr_document_seconds',
+                                 'Time to extract the text of a document, cache hits included', ['kind'])
+OCR_STAGE_SECONDS = histogram('ocr_stage_seconds', 'Time spent in each OCR stage', ['stage'])
+OCR_PAGES = counter('ocr_pages_total', 'Pages extracted, by where their text came from', ['source'])
+OCR_BLANK_PAGES = counter('ocr_blank_pages_total', 'OCR pages the layout pass found blank')
+OCR_INPUT_BYTES = counter('ocr_input_bytes_total', 'Size of the documents extracted', ['kind'])
+OCR_OUTPUT_CHARACTERS = counter('ocr_output_characters_total', 'Characters of text extracted', ['kind'])
+OCR_CACHE_LOOKUPS = counter('ocr_cache_lookups_total', 'OCR result cache lookups', ['kind', 'result'])
+OCR_ERRORS = counter('ocr_errors_total', 'Documents whose extraction failed', ['kind'])
+
+# EasyOCR is optional (for handwriting). Importing it pulls in torch and building the
+# reader loads the model, so only check it is installed here and load it on first use.
+EASYOCR_AVAILABLE = importlib.util.find_spec('easyocr') is not None
+_easyocr_reader = None
+_easyocr_init_lock = threading.Lock()
+# One reader is shared by all threads in a process; run inference one call at a time
+_easyocr_run_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    def _reset_easyocr_locks():
+        # A forked pool worker must not inherit a lock held by another thread of the parent
+        global _easyocr_init_lock, _easyocr_run_lock
+        _easyocr_init_lock = threading.Lock()
+        _easyocr_run_lock = threading.Lock()
+
+    os.register_at_fork(after_in_child=_reset_easyocr_locks)
+
+def get_easyocr_reader():
+    """Shared EasyOCR reader, created on first use"""
+    global _easyocr_reader
+    if _easyocr_reader is None:
+        with _easyocr_init_lock:
+            if _easyocr_reader is None:
+                import easyocr
+                print("[OCR] Loading EasyOCR model...")
+                _easyocr_reader = easyocr.Reader(['en'], gpu=False)
+    return _easyocr_reader
+
+def warm_easyocr_reader():
+    """Load the EasyOCR model on a background thread so the first handwriting request doesn't stall"""
+    if EASYOCR_AVAILABLE and _easyocr_reader is None:
+        threading.Thread(target=get_easyocr_reader, name='easyocr-warmup', daemon=True).start()
+
+def _easyocr_readtext(image):
+    reader = get_easyocr_reader()
+    with _easyocr_run_lock:
+        result = reader.readtext(image, detail=0, paragraph=True)
+    return ' '.join(result)
+
+def _measured(kind):
+    """Record a document extractor's latency, input size and failures under kind"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(path, *args, **kwargs):
+            try:
+                OCR_INPUT_BYTES.inc(os.path.getsize(path), kind=kind)
+            except OSError:
+                pass
+            try:
+                with OCR_DOCUMENT_SECONDS.time(kind=kind):
+                    return fn(path, *args, **kwargs)
+            except Exception:
+                OCR_ERRORS.inc(kind=kind)
+                raise
+        return wrapper
+    return decorate
+
+def _cache_lookup(cache, key, kind):
+    pages = cache.get(key)
+    OCR_CACHE_LOOKUPS.inc(kind=kind, result='miss' if pages is None else 'hit')
+    return pages
+
+def to_grayscale(image):
+    """Greyscale uint8 array from a PIL image or an RGB(A)/grey array"""
+    img_array = np.asarray(image) if isinstance(image, Image.Image) else image
+    if img_array.ndim == 3:
+        code = cv2.COLOR_RGBA2GRAY if img_array.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        return cv2.cvtColor(img_array, code)
+    return img_array
+
+def estimate_noise(gray):
+    """Standard deviation of the image noise in grey levels (Immerkaer's method)"""
+    response = cv2.filter2D(gray.astype(np.float32), -1, NOISE_KERNEL)
+    return float(np.sqrt(np.pi / 2) * np.abs(response[1:-1, 1:-1]).mean() / 6)
+
+def flatten_illumination(gray):
+    """
+    Divide out the page background (a closing wide enough to erase the text,
+    then smoothed), so shadows and uneven lighting don't defeat one global threshold
+    """
+    size = max(BACKGROUND_KERNEL_MIN, min(gray.shape[:2]) // 20)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (size, size))
+    background = cv2.blur(cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel), (size, size))
+    return cv2.divide(gray, background, scale=255)
+
+def load_gray_image(path):
+    """Read an image file straight into a greyscale array (PIL only for formats OpenCV can't read)"""
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        gray = to_grayscale(Image.open(path).convert('RGB'))
+    return gray
+
+def preprocess_image_for_ocr(image, for_handwriting=False, profile=None):
+    """
+    Preprocess image for better OCR results.
+    profile (default OCR_PREPROCESS_PROFILE):
+      quality  - full non-local-means denoise + PIL sharpness/contrast (returns a PIL image)
+      balanced - smaller-window denoise, only when the image is noisy
+      fast     - 3x3 median filter, only when the image is noisy
+    balanced and fast flatten the lighting and binarize with Otsu's global
+    threshold, which holds up on noise and photos where a small adaptive
+    window picks up texture; they stay in NumPy/OpenCV and return a binary array.
+    """
+    profile = profile or OCR_PREPROCESS_PROFILE
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"Unknown preprocessing profile: {profile}")
+    gray = to_grayscale(image)
+
+    # Less aggressive preprocessing for handwriting
+    strength, block_size, offset = (5, 15, 5) if for_handwriting else (10, 11, 2)
+
+    noise = estimate_noise(gray) if profile != 'quality' else None
+    if profile == 'quality':
+        denoised = cv2.fastNlMeansDenoising(gray, None, strength, 7, 21)
+    elif noise < CLEAN_NOISE_SIGMA:
+        # Clean scan or digital render: denoising would cost more than the whole OCR
+        denoised = gray
+    elif profile == 'balanced':
+        # Filter strength follows the measured noise, or heavy noise survives as specks
+        denoised = cv2.fastNlMeansDenoising(gray, None, max(strength, noise), 7, 11)
     else:
-        # Standard preprocessing for printed text
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-        binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                       cv2.THRESH_BINARY, 11, 2)
-    
+        denoised = cv2.medianBlur(gray, 3)
+
+    if profile != 'quality':
+        _, binary = cv2.threshold(flatten_illumination(denoised), 0, 255,
+                                  cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY, block_size, offset)
+
     pil_image = Image.fromarray(binary)
     enhancer = ImageEnhance.Sharpness(pil_image)
     sharpened = enhancer.enhance(2.0)
@@ -48,52 +180,325 @@ def preprocess_image_for_ocr(image, for_handwriting=False):
     contrasted = enhancer.enhance(1.5)
     return contrasted
 
-def image_path_to_text(path, use_easyocr=False):
+@_measured('image')
+def image_path_to_text(path, use_easyocr=False, use_cache=True, progress=None, profile=None):
     """
     Extract text from image.
     Set use_easyocr=True for better handwriting recognition.
+    profile selects the preprocessing (see preprocess_image_for_ocr).
+    progress(done, total) is called once the image has been processed.
     """
-    if use_easyocr and EASYOCR_AVAILABLE:
+    engine = 'easyocr' if use_easyocr and EASYOCR_AVAILABLE else 'tesseract'
+    profile = profile or OCR_PREPROCESS_PROFILE
+    cache = get_ocr_cache() if use_cache else None
+    if cache:
+        kind = 'handwriting' if use_easyocr else 'printed'
+        preprocessing = _tesseract_preprocessing_key(kind, profile) if engine == 'tesseract' else kind
+        key = cache.make_key(path, engine, dpi='auto' if OCR_ADAPTIVE_RESOLUTION else None,
+                             preprocessing=preprocessing,
+                             config=TESSERACT_CONFIG if engine == 'tesseract' else None)
+        pages = _cache_lookup(cache, key, 'image')
+        if pages is not None:
+            print(f"[OCR] Cache hit: {path}")
+            if progress:
+                progress(1, 1)
+            return pages[0]['text']
+
+    layout = {}
+    if engine == 'easyocr':
         # Use EasyOCR for handwriting
-        result = easyocr_reader.readtext(path, detail=0, paragraph=True)
-        return ' '.join(result)
+        with OCR_STAGE_SECONDS.time(stage='recognize'):
+            text = _easyocr_readtext(path)
     else:
         # Use Tesseract for printed text
-        img = Image.open(path)
-        processed_img = preprocess_image_for_ocr(img, for_handwriting=use_easyocr)
-        # PSM 6: Assume uniform block of text
-        # PSM 7: Treat image as single text line (good for handwriting)
-        custom_config = r'--oem 3 --psm 6'
-        return pytesseract.image_to_string(processed_img, config=custom_config)
-
-def pdf_to_text(pdf_path, use_easyocr=False):
-    """Extract text from PDF"""
+        img = Image.open(path) if profile == 'quality' else load_gray_image(path)
+        if OCR_ADAPTIVE_RESOLUTION:
+            # Camera photos come at full sensor resolution; shrink them until the text is
+            # about as tall as Tesseract wants
+            gray = to_grayscale(img)
+            scale = choose_image_scale(gray)
+            if scale < 1.0:
+                print(f"[OCR] Downscaling {gray.shape[1]}x{gray.shape[0]} image by {scale:.2f}")
+                img = downscale(gray, scale)
+        parts = [img]
+        if OCR_TEXT_REGIONS:
+            with OCR_STAGE_SECONDS.time(stage='layout'):
+                parts, layout = _text_region_crops(img)
+            print(f"[OCR] {len(parts)} text regions, skipping {layout['skipped_area']:.0%} of the image")
+            if layout['blank']:
+                OCR_BLANK_PAGES.inc()
+        with OCR_STAGE_SECONDS.time(stage='preprocess'):
+            images = [preprocess_image_for_ocr(part, for_handwriting=use_easyocr, profile=profile)
+                      for part in parts]
+        with OCR_STAGE_SECONDS.time(stage='recognize'):
+            text = _join_regions(recognize_batch(images))
+
+    OCR_PAGES.inc(source=engine)
+    OCR_OUTPUT_CHARACTERS.inc(len(text), kind='image')
+    if cache:
+        cache.put(key, [{'page': 1, 'text': text, 'source': engine, **layout}])
+    if progress:
+        progress(1, 1)
+    return text
+
+def _render_pdf_pages(pdf_path, page_numbers, engine, profile):
+    """
+    Rasterize a batch of pages (ascending page numbers) for the engine.
+    Returns a (page image, dpi) per page. poppler starts once for the
+    probe of the whole batch and once per run of consecutive pages that
+    share a dpi, not once or twice per page.
+    """
+    # Tesseract only needs grey levels; poppler can render them directly
+    grayscale = engine == 'tesseract' and profile != 'quality'
+    dpis = [PDF_DPI] * len(page_numbers)
+    if OCR_ADAPTIVE_RESOLUTION and engine == 'tesseract':
+        # Measure the text on a cheap low-dpi render, then render just large enough
+        first = page_numbers[0]
+        probes = convert_from_path(pdf_path, poppler_path=POPPLER_PATH, dpi=PROBE_DPI, grayscale=True,
+                                   first_page=first, last_page=page_numbers[-1])
+        dpis = [choose_pdf_dpi(to_grayscale(probes[n - first]), max_dpi=PDF_DPI) for n in page_numbers]
+        del probes
+        for n, dpi in zip(page_numbers, dpis):
+            print(f"[OCR] Page {n}: rasterizing at {dpi} dpi")
+
+    rendered = []
+    start = 0
+    while start < len(page_numbers):
+        end = start + 1
+        while (end < len(page_numbers) and page_numbers[end] == page_numbers[end - 1] + 1
+               and dpis[end] == dpis[start]):
+            end += 1
+        pages = convert_from_path(pdf_path, poppler_path=POPPLER_PATH, dpi=dpis[start], grayscale=grayscale,
+                                  first_page=page_numbers[start], last_page=page_numbers[end - 1])
+        rendered.extend(zip(pages, dpis[start:end]))
+        start = end
+    return rendered
+
+def _tesseract_preprocessing_key(kind, profile):
+    return f"{kind}:{profile}:regions" if OCR_TEXT_REGIONS else f"{kind}:{profile}"
+
+def _text_region_crops(image):
+    """
+    Layout pre-pass (see layout.find_text_regions): the text blocks of a page
+    to OCR, and its layout metadata {'blank', 'regions', 'skipped_area'}
+    """
+    gray = to_grayscale(image)
+    regions = find_text_regions(gray)
+    layout = {'blank': not regions, 'regions': [list(r) for r in regions],
+              'skipped_area': round(skipped_area(regions, gray.shape), 4)}
+    return [crop(image, r) for r in regions], layout
+
+def _join_regions(texts):
+    return '\n\n'.join(t.strip() for t in texts if t.strip())
+
+class _StageClock:
+    """Collects (stage, seconds) timings where the metrics can't be recorded (a pool worker)"""
+
+    def __init__(self):
+        self.timings = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.timings.append((name, time.perf_counter() - start))
+
+def _ocr_pdf_pages(pdf_path, page_numbers, engine, profile):
+    """
+    Rasterize and OCR a batch of pages. Returns a {'text', ...} dict per page
+    in order (with the layout metadata when OCR_TEXT_REGIONS finds the text
+    blocks first, Tesseract only) and the (stage, seconds) timings of the batch.
+    Also the process pool task: rasterizing inside the worker avoids pickling
+    300 dpi images across processes, and Tesseract reads the whole batch in
+    one call (see tesseract_engine).
+    """
+    clock = _StageClock()
+    with clock.stage('render'):
+        rendered = _render_pdf_pages(pdf_path, page_numbers, engine, profile)
+    if engine == 'easyocr':
+        results = []
+        for page, _ in rendered:
+            with clock.stage('recognize'):
+                # Convert PIL to numpy array for EasyOCR
+                results.append({'text': _easyocr_readtext(np.array(page))})
+        return results, clock.timings
+    results, images, dpis, owners = [], [], [], []
+    for page, dpi in rendered:
+        parts, layout = [page], {}
+        if OCR_TEXT_REGIONS:
+            with clock.stage('layout'):
+                parts, layout = _text_region_crops(page)
+        with clock.stage('preprocess'):
+            for part in parts:
+                images.append(preprocess_image_for_ocr(part, for_handwriting=False, profile=profile))
+                dpis.append(dpi)
+                owners.append(len(results))
+        results.append({'dpi': dpi, **layout})
+
+    texts = [[] for _ in results]
+    with clock.stage('recognize'):
+        recognized = recognize_batch(images, dpis)
+    for owner, text in zip(owners, recognized):
+        texts[owner].append(text)
+    pages = [{'text': _join_regions(page_texts), **layout} for page_texts, layout in zip(texts, results)]
+    return pages, clock.timings
+
+def _record_stages(batch):
+    """Record a batch's stage timings here (it may have run in a pool worker) and return its pages"""
+    pages, timings = batch
+    for stage, seconds in timings:
+        OCR_STAGE_SECONDS.observe(seconds, stage=stage)
+    return pages
+
+def _page_batches(page_numbers, size):
+    return [page_numbers[i:i + size] for i in range(0, len(page_numbers), size)]
+
+_ocr_pools = {}
+_ocr_pools_lock = threading.Lock()
+
+def _get_ocr_pool(workers):
+    """Shared, bounded process pool so concurrent uploads don't oversubscribe the CPU"""
+    with _ocr_pools_lock:
+        pool = _ocr_pools.get(workers)
+        if pool is None:
+            if EASYOCR_PRELOAD and EASYOCR_AVAILABLE and multiprocessing.get_start_method() == 'fork':
+                # Load the model before forking so workers share its memory copy-on-write
+                get_easyocr_reader()
+            pool = ProcessPoolExecutor(max_workers=workers)
+            _ocr_pools[workers] = pool
+        return pool
+
+def _ocr_pages_parallel(pdf_path, page_numbers, engine, profile, workers):
+    """OCR the given pages on the process pool in batches, yielding results in page order"""
+    pool = _get_ocr_pool(workers)
+    # Small enough batches that every worker gets some
+    size = max(1, min(OCR_BATCH_PAGES, -(-len(page_numbers) // workers)))
+    futures = [pool.submit(_ocr_pdf_pages, pdf_path, batch, engine, profile)
+               for batch in _page_batches(page_numbers, size)]
+    for future in futures:
+        yield from _record_stages(future.result())
+
+def _ocr_pages_serial(pdf_path, page_numbers, engine, profile):
+    # One batch at a time keeps at most OCR_BATCH_PAGES rasters in memory
+    for batch in _page_batches(page_numbers, OCR_BATCH_PAGES):
+        yield from _record_stages(_ocr_pdf_pages(pdf_path, batch, engine, profile))
+
+def extract_text_layer(pdf_path):
+    """
+    Embedded text of every page, read with poppler's pdftotext.
+    Returns a list of page texts, or None if pdftotext is unavailable or fails.
+    """
+    cmd = os.path.join(POPPLER_PATH, 'pdftotext') if POPPLER_PATH else 'pdftotext'
+    try:
+        result = subprocess.run([cmd, '-enc', 'UTF-8', pdf_path, '-'],
+                                capture_output=True, timeout=PDFTOTEXT_TIMEOUT, check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[OCR] No text layer available: {e}")
+        return None
+
+    pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+    # pdftotext ends every page with a form feed, leaving an empty trailing item
+    if pages and not pages[-1]:
+        pages.pop()
+    return pages
+
+def has_usable_text(text):
+    """True if an embedded text layer has enough real characters to skip OCR"""
+    return sum(c.isalnum() for c in text) >= PDF_TEXT_LAYER_MIN_CHARS
+
+@_measured('pdf')
+def pdf_to_pages(pdf_path, use_easyocr=False, use_cache=True, workers=None, progress=None, profile=None):
+    """
+    Extract text from every PDF page as {'page', 'text', 'source'} dicts.
+    Pages with a usable embedded text layer are read directly (source 'text_layer');
+    only the remaining pages are rasterized and OCRed (source 'tesseract' or 'easyocr').
+    With workers > 1 (default OCR_WORKERS) those pages are OCRed in parallel on a process pool.
+    With OCR_TEXT_REGIONS, Tesseract pages also report 'dpi', 'blank', 'regions'
+    ([x, y, w, h] text blocks at that dpi, the only parts OCRed) and 'skipped_area'
+    (fraction of the page left out).
+    profile selects the image preprocessing (see preprocess_image_for_ocr).
+    progress(pages_done, pages_total) is called as pages complete.
+    """
+    engine = 'easyocr' if use_easyocr and EASYOCR_AVAILABLE else 'tesseract'
+    workers = OCR_WORKERS if workers is None else workers
+    profile = profile or OCR_PREPROCESS_PROFILE
+    cache = get_ocr_cache() if use_cache else None
+    if cache:
+        preprocessing = _tesseract_preprocessing_key('printed', profile) if engine == 'tesseract' else 'printed'
+        key = cache.make_key(pdf_path, engine,
+                             dpi='auto' if OCR_ADAPTIVE_RESOLUTION and engine == 'tesseract' else PDF_DPI,
+                             preprocessing=preprocessing,
+                             config=TESSERACT_CONFIG if engine == 'tesseract' else None)
+        pages = _cache_lookup(cache, key, 'pdf')
+        if pages is not None:
+            print(f"[OCR] Cache hit: {pdf_path} ({len(pages)} pages)")
+            if progress:
+                progress(len(pages), len(pages))
+            return pages
+
+    with OCR_STAGE_SECONDS.time(stage='text_layer'):
+        layer = extract_text_layer(pdf_path)
+        if layer is None:
+            layer = [''] * pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)['Pages']
+
+    pages = [{'page': i, 'text': text, 'source': 'text_layer'} if has_usable_text(text) else None
+             for i, text in enumerate(layer, start=1)]
+    ocr_page_numbers = [i for i, page in enumerate(pages, start=1) if page is None]
+    total = len(pages)
+    done = total - len(ocr_page_numbers)
+    print(f"[OCR] {done}/{total} pages have a text layer, OCRing {len(ocr_page_numbers)}")
+    if progress:
+        progress(done, total)
+
+    if workers > 1 and len(ocr_page_numbers) > 1:
+        results = _ocr_pages_parallel(pdf_path, ocr_page_numbers, engine, profile, workers)
+    else:
+        results = _ocr_pages_serial(pdf_path, ocr_page_numbers, engine, profile)
+
+    for page_number, result in zip(ocr_page_numbers, results):
+        pages[page_number - 1] = {'page': page_number, 'text': result.pop('text'), 'source': engine, **result}
+        done += 1
+        print(f"Processed page {page_number} ({done}/{total})...")
+        if progress:
+            progress(done, total)
+
+    for page in pages:
+        OCR_PAGES.inc(source=page['source'])
+        OCR_OUTPUT_CHARACTERS.inc(len(page['text']), kind='pdf')
+
+    laid_out = [pages[n - 1] for n in ocr_page_numbers if 'skipped_area' in pages[n - 1]]
+    if laid_out:
+        blank = sum(page['blank'] for page in laid_out)
+        OCR_BLANK_PAGES.inc(blank)
+        skipped = sum(page['skipped_area'] for page in laid_out) / len(laid_out)
+        print(f"[OCR] Layout: {blank} blank pages, {skipped:.0%} of the OCR pages' area skipped")
+
+    if cache:
+        cache.put(key, pages)
+    return pages
+
+def pdf_to_text(pdf_path, use_easyocr=False, use_cache=True, workers=None, progress=None, profile=None):
+    """Extract text from PDF (see pdf_to_pages for the options)"""
     try:
-        pages = convert_from_path(pdf_path, poppler_path=POPPLER_PATH, dpi=300)
+        pages = pdf_to_pages(pdf_path, use_easyocr=use_easyocr, use_cache=use_cache,
+                             workers=workers, progress=progress, profile=profile)
         text = ""
-        for i, page in enumerate(pages, start=1):
-            print(f"Processing page {i}/{len(pages)}...")
-            
-            if use_easyocr and EASYOCR_AVAILABLE:
-                # Convert PIL to numpy array for EasyOCR
-                page_array = np.array(page)
-                result = easyocr_reader.readtext(page_array, detail=0, paragraph=True)
-                page_text = ' '.join(result)
-            else:
-                processed = preprocess_image_for_ocr(page, for_handwriting=False)
-                page_text = pytesseract.image_to_string(processed, config=r'--oem 3 --psm 6')
-            
-            text += f"\n--- Page {i} ---\n" + page_text
+        for page in pages:
+            text += f"\n--- Page {page['page']} ---\n" + page['text']
         return text
     except Exception as e:
         print(f"Error processing PDF: {e}")
         return ""
 
+@_measured('docx')
 def docx_to_text(path):
     """Extract text from DOCX file"""
     try:
         doc = docx.Document(path)
-        return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+        text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
     except Exception as e:
         print(f"Error reading DOCX: {e}")
-        return ""
\ No newline at end of file
+        OCR_ERRORS.inc(kind='docx')
+        return ""
+    OCR_OUTPUT_CHARACTERS.inc(len(text), kind='docx')
+    return text
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Adaptive OCR resolution.
+
+Tesseract is most accurate when glyphs are roughly 20-30 px tall; larger
+text only adds pixels to binarize and search. The dominant glyph height
+is measured from the connected components of a cheap low-resolution
+pass, and PDF pages are rasterized (or camera images downscaled) so that
+it lands near OCR_TARGET_TEXT_HEIGHT.
+"""
+
+import cv2
+import numpy as np
+
+from config.config import OCR_TARGET_TEXT_HEIGHT
+
+# PDF pages are probed at this dpi and never rendered below MIN_DPI
+PROBE_DPI = 100
+MIN_DPI = 100
+# Images are measured on a copy whose longest side is at most this many pixels
+PROBE_MAX_SIDE = 1200
+# Fewer glyph-like components than this and there is no reliable estimate
+MIN_COMPONENTS = 5
+# Don't resample an image for less than this much reduction
+MIN_DOWNSCALE = 0.9
+
+
+def glyph_components(gray):
+    """
+    Bounding boxes (x, y, w, h, area rows) of the connected components of a
+    greyscale page that are shaped like characters
+    """
+    # Local threshold: camera photos are unevenly lit
+    binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 15)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    stats = stats[1:]
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    areas = stats[:, cv2.CC_STAT_AREA]
+    # Drop specks, rules/underlines, and blobs too big to be a character (photos, borders)
+    glyphs = ((heights >= 3) & (areas >= 6)
+              & (widths <= heights * 8) & (heights <= widths * 15)
+              & (heights <= gray.shape[0] * 0.2))
+    return stats[glyphs]
+
+
+def typical_height(glyphs):
+    """Ink-weighted median height of glyph boxes, so leftover specks don't outvote the letters"""
+    heights, areas = glyphs[:, cv2.CC_STAT_HEIGHT], glyphs[:, cv2.CC_STAT_AREA]
+    order = np.argsort(heights)
+    cumulative = np.cumsum(areas[order])
+    return float(heights[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+def estimate_text_height(gray):
+    """
+    Typical height in pixels of the glyph-like connected components of a
+    greyscale page, or None if it holds too little text to tell.
+    """
+    glyphs = glyph_components(gray)
+    if len(glyphs) < MIN_COMPONENTS:
+        return None
+    return typical_height(glyphs)
+
+
+def choose_pdf_dpi(probe_gray, max_dpi, probe_dpi=PROBE_DPI, target=OCR_TARGET_TEXT_HEIGHT):
+    """
+    Rasterization dpi (at most max_dpi) that puts the text of a page
+    probed at probe_dpi near target px
+    """
+    height = estimate_text_height(probe_gray)
+    if height is None:
+        return max_dpi
+    dpi = probe_dpi * target / height
+    return int(min(max_dpi, max(MIN_DPI, round(dpi / 10) * 10)))
+
+
+def choose_image_scale(gray, target=OCR_TARGET_TEXT_HEIGHT):
+    """Downscale factor (<= 1) that brings an image's text near target px"""
+    longest = max(gray.shape[:2])
+    factor = min(1.0, PROBE_MAX_SIDE / float(longest))
+    probe = gray if factor == 1.0 else cv2.resize(gray, None, fx=factor, fy=factor,
+                                                  interpolation=cv2.INTER_AREA)
+    height = estimate_text_height(probe)
+    if height is None:
+        return 1.0
+    scale = target / (height / factor)
+    return scale if scale < MIN_DOWNSCALE else 1.0
+
+
+def downscale(gray, scale):
+    """Resize for OCR (area averaging keeps thin strokes)"""
+    if scale >= 1.0:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,152 @@
+"""
+Tesseract OCR without a process (and model load) per page.
+
+With tesserocr installed, each process keeps initialized Tesseract APIs
+resident and reuses them for every image, so pool workers pay the model
+load once. Without it, a batch of pages is written as one in-memory
+multi-page TIFF and piped through a single `tesseract stdin stdout` run,
+so a batch costs one process start instead of one per page, and no temp
+images are written either way.
+"""
+
+import io
+import os
+import queue
+import subprocess
+
+import numpy as np
+from PIL import Image, TiffImagePlugin
+
+from config.config import TESSERACT_CMD
+
+TESSERACT_LANG = 'eng'
+TESSERACT_OEM = 3  # Default engine (LSTM where available)
+TESSERACT_PSM = 6  # Assume a uniform block of text
+# PSM 7 treats the image as a single text line (good for handwriting)
+TESSERACT_CONFIG = f'--oem {TESSERACT_OEM} --psm {TESSERACT_PSM}'
+# The CLI gets this long per page of a batch
+CLI_TIMEOUT_PER_PAGE = 120
+PAGE_SEPARATOR = '\f'
+# Tesseract's own assumption for images without a resolution
+DEFAULT_DPI = 70
+
+try:
+    # Imported up front: tesserocr's cysignals installs signal handlers on import,
+    # which fails anywhere but the main thread (e.g. an upload's OCR job thread)
+    import tesserocr
+except (ImportError, ValueError):
+    tesserocr = None
+
+TESSEROCR_AVAILABLE = tesserocr is not None
+_tesserocr_usable = TESSEROCR_AVAILABLE
+# Idle initialized APIs of this process (tesserocr APIs must not be shared between threads)
+_apis = queue.LifoQueue()
+
+if hasattr(os, 'register_at_fork'):
+    def _reset_apis():
+        # A forked pool worker starts its own APIs instead of sharing the parent's
+        global _apis
+        _apis = queue.LifoQueue()
+
+    os.register_at_fork(after_in_child=_reset_apis)
+
+
+def _new_api():
+    """A fresh initialized API, or None if tesserocr can't load the model"""
+    global _tesserocr_usable
+    print(f"[OCR] Loading Tesseract model in process {os.getpid()}...")
+    try:
+        return tesserocr.PyTessBaseAPI(lang=TESSERACT_LANG, oem=TESSERACT_OEM, psm=TESSERACT_PSM)
+    except RuntimeError as e:
+        # e.g. its libtesseract doesn't find the traineddata the tesseract binary uses
+        print(f"[OCR] tesserocr unavailable, using the tesseract CLI: {e}")
+        _tesserocr_usable = False
+        return None
+
+
+def _to_pil(image):
+    return Image.fromarray(image) if isinstance(image, np.ndarray) else image
+
+
+def _tesserocr_recognize(images, dpis):
+    try:
+        api = _apis.get_nowait()
+    except queue.Empty:
+        api = _new_api()
+        if api is None:
+            return None
+    try:
+        texts = []
+        for image, dpi in zip(images, dpis):
+            api.SetImage(_to_pil(image))
+            if dpi:
+                api.SetSourceResolution(int(dpi))
+            texts.append(api.GetUTF8Text())
+        api.Clear()
+    except Exception:
+        api.End()
+        raise
+    _apis.put(api)
+    return texts
+
+
+def _multipage_tiff(images, dpis):
+    """One uncompressed multi-page TIFF of the images, in memory, each page tagged with its dpi"""
+    buffer = io.BytesIO()
+    with TiffImagePlugin.AppendingTiffWriter(buffer) as writer:
+        for image, dpi in zip(images, dpis):
+            frame = _to_pil(image)
+            # Leptonica reads 1, 8 and 24 bit pages; normalize anything else
+            if frame.mode not in ('1', 'L', 'RGB'):
+                frame = frame.convert('RGB')
+            frame.save(writer, format='TIFF', dpi=(dpi or DEFAULT_DPI,) * 2)
+            writer.newFrame()
+    return buffer.getvalue()
+
+
+def _cli_recognize(images, dpis):
+    data = _multipage_tiff(images, dpis)
+    cmd = [TESSERACT_CMD, 'stdin', 'stdout', '-l', TESSERACT_LANG,
+           '--oem', str(TESSERACT_OEM), '--psm', str(TESSERACT_PSM)]
+    result = subprocess.run(cmd, input=data, capture_output=True,
+                            timeout=CLI_TIMEOUT_PER_PAGE * len(images))
+    if result.returncode != 0:
+        raise RuntimeError(f"Tesseract failed ({result.returncode}): "
+                           f"{result.stderr.decode('utf-8', errors='replace').strip()}")
+
+    texts = result.stdout.decode('utf-8', errors='replace').split(PAGE_SEPARATOR)
+    # Tesseract writes the separator after every page, leaving an empty trailing item
+    if len(texts) == len(images) + 1 and not texts[-1].strip():
+        texts.pop()
+    if len(texts) != len(images):
+        raise RuntimeError(f"Tesseract returned {len(texts)} pages for {len(images)} images")
+    return texts
+
+
+def recognize_batch(images, dpis=None):
+    """
+    Text of each image (PIL images or numpy arrays) in order.
+    dpis optionally gives each image's resolution.
+    """
+    if not images:
+        return []
+    dpis = list(dpis) if dpis is not None else [None] * len(images)
+    if _tesserocr_usable:
+        texts = _tesserocr_recognize(images, dpis)
+        if texts is not None:
+            return texts
+    return _cli_recognize(images, dpis)
+
+
+def recognize(image, dpi=None):
+    """Text of a single image"""
+    return recognize_batch([image], [dpi])[0]
+
+
+def engine_available():
+    """True if either tesserocr or the tesseract CLI can run"""
+    try:
+        recognize(np.full((32, 32), 255, dtype=np.uint8))
+        return True
+    except Exception:
+        return False
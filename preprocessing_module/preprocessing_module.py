@@ -2,49 +2,113 @@
 Text preprocessing module with OCR error correction
 """
 
-def preprocess_text(text):
+import glob
+import os
+import re
+from functools import lru_cache
+
+from config.config import OCR_CORRECTIONS_DIR
+from metrics_module.metrics_module import counter, histogram
+
+# Corrections are looked up one word at a time, so the cost of a pass is
+# linear in the text length no matter how many corrections are loaded.
+WORD_RE = re.compile(r"\w+")
+SINGLE_WORD_RE = re.compile(r"^\w+$")
+
+PREPROCESS_SECONDS = histogram('preprocess_text_seconds', 'Time to correct and clean extracted text')
+PREPROCESS_CHARACTERS = counter('preprocess_text_characters_total', 'Characters of text preprocessed')
+
+
+def load_corrections(path):
+    """Read a <misread>\\t<correction> file, skipping blank lines and # comments"""
+    corrections = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            parts = line.split('\t')
+            if len(parts) != 2 or not parts[0]:
+                print(f"[PREPROCESS] Skipping malformed correction in {path}: {line!r}")
+                continue
+            corrections[parts[0]] = parts[1]
+    return corrections
+
+
+@lru_cache(maxsize=None)
+def default_corrections():
+    """All corrections from the *.tsv files in OCR_CORRECTIONS_DIR"""
+    corrections = {}
+    for path in sorted(glob.glob(os.path.join(OCR_CORRECTIONS_DIR, '*.tsv'))):
+        corrections.update(load_corrections(path))
+    return corrections
+
+
+class CorrectionEngine:
+    """
+    Applies whole-word OCR corrections in a single pass.
+    Single-word entries go through a dict lookup per token; entries that
+    contain spaces or punctuation are matched with one compiled alternation.
+    """
+
+    def __init__(self, corrections):
+        self.words = {}
+        self.phrases = {}
+        for wrong, correct in corrections.items():
+            if SINGLE_WORD_RE.match(wrong):
+                self.words[wrong] = correct
+            else:
+                self.phrases[wrong] = correct
+
+        self.phrase_re = None
+        if self.phrases:
+            alternation = '|'.join(re.escape(p) for p in sorted(self.phrases, key=len, reverse=True))
+            self.phrase_re = re.compile(r'(?<!\w)(?:' + alternation + r')(?!\w)')
+
+    def apply(self, text):
+        if self.phrase_re is not None:
+            text = self.phrase_re.sub(lambda m: self.phrases[m.group(0)], text)
+        if self.words:
+            words = self.words
+            text = WORD_RE.sub(lambda m: words.get(m.group(0), m.group(0)), text)
+        return text
+
+
+@lru_cache(maxsize=64)
+def _engine_for(extra_items):
+    corrections = dict(default_corrections())
+    corrections.update(extra_items)
+    return CorrectionEngine(corrections)
+
+
+def get_correction_engine(extra_corrections=None):
+    """Engine for the default corrections plus optional per-user additions"""
+    return _engine_for(frozenset((extra_corrections or {}).items()))
+
+
+@PREPROCESS_SECONDS.time()
+def preprocess_text(text, extra_corrections=None):
     """
-    Main preprocessing function with common OCR error corrections
+    Main preprocessing function with common OCR error corrections.
+    extra_corrections ({misread: correction}) are applied on top of the
+    shared correction files, e.g. a user's own additions.
     """
-    # Common OCR errors dictionary (case-sensitive)
-    ocr_corrections = {
-        'Absiract': 'Abstract',
-        'absiract': 'abstract',
-        'wilh': 'with',
-        'lhe': 'the',
-        'Lhe': 'The',
-        'compuler': 'computer',
-        'Compuler': 'Computer',
-        'syslem': 'system',
-        'Syslem': 'System',
-        'dala': 'data',
-        'Dala': 'Data',
-        'informalion': 'information',
-        'Informalion': 'Information',
-        'wilhin': 'within',
-        'communicalion': 'communication',
-        'Communicalion': 'Communication',
-        'compulational': 'computational',
-        'Compulational': 'Computational',
-    }
-    
+    PREPROCESS_CHARACTERS.inc(len(text))
+
     # Apply corrections
-    for wrong, correct in ocr_corrections.items():
-        text = text.replace(wrong, correct)
-    
+    text = get_correction_engine(extra_corrections).apply(text)
+
     # Basic cleanup - normalize line breaks
     text = text.replace("\r\n", "\n")
     text = text.replace("\r", "\n")
-    
+
     # Remove excessive spaces (more than 2 spaces become 1)
-    while "   " in text:
-        text = text.replace("   ", " ")
-    
+    text = re.sub(r" {3,}", " ", text)
+
     # Remove excessive blank lines (more than 3 newlines become 2)
-    while "\n\n\n\n" in text:
-        text = text.replace("\n\n\n\n", "\n\n")
-    
+    text = re.sub(r"\n{4,}", "\n\n", text)
+
     # Trim start and end
     text = text.strip()
-    
+
     return text
@@ -0,0 +1,199 @@
+"""
+Opt-in profiling of single requests and background jobs.
+
+A Profile runs cProfile on the thread that started it and tracemalloc
+for the whole process, and collects the stage metrics (see
+metrics_module) observed on that thread. When it stops, the raw stats
+are written to PROFILE_DIR as <id>.prof (load with pstats or snakeviz)
+next to <id>.json: route, document, wall/CPU time, peak traced memory,
+the largest allocation sites, per-stage times and the hottest functions.
+Work in OCR pool processes is not profiled, but its stage timings are
+recorded by the job thread and show up in the stage breakdown.
+
+cProfile runs for one profile at a time (Python 3.12+ allows only one
+enabled profiler per process); a profile that overlaps it still records
+wall/CPU time, memory and stages, without the .prof file ("cprofile": false).
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from config.config import PROFILE_DIR
+from metrics_module.metrics_module import unwatch_observations, watch_observations
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+# Held by the profile whose cProfile profiler is enabled
+_cprofile_lock = threading.Lock()
+# The profile running on this thread, if any
+_active = threading.local()
+
+
+def _start_tracing():
+    """Start tracemalloc for a profile; returns True if no other profile is tracing"""
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        alone = _tracing_users == 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        if alone:
+            tracemalloc.reset_peak()
+        _tracing_users += 1
+        return alone
+
+
+def _stop_tracing():
+    """Peak and a snapshot of the traced memory; tracemalloc stops with the last profile"""
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        _tracing_users -= 1
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+    return peak, snapshot
+
+
+def _enable_cprofile():
+    """An enabled cProfile profiler, or None while another profile (or tool) has one"""
+    if not _cprofile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except Exception as e:
+        # e.g. a debugger or coverage run already owns the profiling hook
+        _cprofile_lock.release()
+        print(f"[PROFILE] cProfile unavailable, recording timings only: {e}")
+        return None
+    return profiler
+
+
+def _disable_cprofile(profiler):
+    profiler.disable()
+    _cprofile_lock.release()
+
+
+def _stage_breakdown(observations):
+    """{'metric{label=value}': {'count', 'seconds'}} summed over the observations"""
+    stages = {}
+    for name, labels, value in observations:
+        key = name + ('{' + ','.join(f"{k}={v}" for k, v in sorted(labels.items())) + '}' if labels else '')
+        stage = stages.setdefault(key, {'count': 0, 'seconds': 0.0})
+        stage['count'] += 1
+        stage['seconds'] = round(stage['seconds'] + value, 6)
+    return dict(sorted(stages.items(), key=lambda item: -item[1]['seconds']))
+
+
+def _top_functions(stats):
+    out = io.StringIO()
+    pstats.Stats(stats, stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return out.getvalue().splitlines()
+
+
+def _top_allocations(snapshot):
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    return [{'site': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]]
+
+
+class Profile:
+    """
+    Profile of one request or job: start() ... stop(), or a with block.
+    meta (route, doc_id, ...) is saved with the results and can be added
+    to until the profile stops.
+    """
+
+    def __init__(self, name, profile_dir=PROFILE_DIR, **meta):
+        self.id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}_{uuid.uuid4().hex[:6]}"
+        self.name = name
+        self.profile_dir = profile_dir
+        self.meta = meta
+        self.nested = False
+        self._started = False
+        self._profiler = None
+
+    def start(self):
+        if getattr(_active, 'profile', None) is not None:
+            # e.g. a job run inline by a profiled request: the outer profile covers it
+            self.nested = True
+            return self
+        self._observations = []
+        watch_observations(self._observations)
+        try:
+            self._alone = _start_tracing()
+        except BaseException:
+            unwatch_observations(self._observations)
+            raise
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        self._profiler = _enable_cprofile()
+        self._started = True
+        _active.profile = self
+        return self
+
+    def stop(self, **meta):
+        """Write the results; returns the path of the JSON summary (None for a nested profile)"""
+        self.meta.update(meta)
+        if self.nested or not self._started:
+            return None
+        self._started = False
+        if self._profiler is not None:
+            _disable_cprofile(self._profiler)
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        _active.profile = None
+        unwatch_observations(self._observations)
+        peak, snapshot = _stop_tracing()
+
+        stats_path = os.path.join(self.profile_dir, f"{self.id}.prof") if self._profiler else None
+        summary_path = os.path.join(self.profile_dir, f"{self.id}.json")
+        summary = {
+            'id': self.id,
+            'name': self.name,
+            **self.meta,
+            'started_at': datetime.fromtimestamp(time.time() - wall).isoformat(),
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'tracemalloc_peak_bytes': peak,
+            # Overlapping profiles share tracemalloc, so the peak may include their allocations
+            'tracemalloc_exclusive': self._alone,
+            'stages': _stage_breakdown(self._observations),
+            'top_allocations': _top_allocations(snapshot),
+            'cprofile': self._profiler is not None,
+            'top_functions': _top_functions(self._profiler) if self._profiler else [],
+            'stats_file': os.path.basename(stats_path) if stats_path else None,
+        }
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            if stats_path:
+                self._profiler.dump_stats(stats_path)
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, default=str)
+        except OSError as e:
+            # A profile that can't be saved must not fail the request or job it measured
+            print(f"[PROFILE] Could not save {self.id}: {e}")
+            return None
+        print(f"[PROFILE] {self.name}: {wall * 1000:.0f} ms, peak {peak / 1e6:.1f} MB traced -> {summary_path}")
+        return summary_path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(**({'error': f"{exc_type.__name__}: {exc}"} if exc_type else {}))
+        return False
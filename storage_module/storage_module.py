@@ -0,0 +1,274 @@
+"""
+SQLite-backed user and document store.
+
+Replaces the whole-file JSON rewrites: every route does indexed point
+reads and small transactional writes. The database runs in WAL mode so
+readers never block the writer, and each thread gets its own connection.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from config.config import DB_FILE, USERS_JSON_FILE, DOCUMENTS_JSON_FILE
+from metrics_module.metrics_module import histogram
+
+PREVIEW_LENGTH = 200
+
+STORE_SECONDS = histogram('store_operation_seconds', 'Time per document store operation', ['operation'])
+
+DOCUMENT_SORTS = {
+    'newest': 'created_at DESC, id DESC',
+    'oldest': 'created_at ASC, id ASC',
+    'title': 'title COLLATE NOCASE ASC, created_at ASC, id ASC',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    password TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    preferences TEXT NOT NULL DEFAULT '{}',
+    ocr_corrections TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
+
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    user_email TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+-- Covering indexes: the upload page lists id/title/preview/created_at without
+-- ever touching the rows (and the overflow pages holding the full text)
+DROP INDEX IF EXISTS idx_documents_user;
+CREATE INDEX IF NOT EXISTS idx_documents_listing
+    ON documents(user_email, created_at, id, title, preview);
+CREATE INDEX IF NOT EXISTS idx_documents_listing_title
+    ON documents(user_email, title COLLATE NOCASE, created_at, id, preview);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_db_file = DB_FILE
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def get_connection():
+    """This thread's connection, opened (and the schema created) on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'db_file', None) != _db_file:
+        init_db(_db_file)
+        conn = sqlite3.connect(_db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        _local.db_file = _db_file
+    return conn
+
+
+def init_db(db_file=DB_FILE, users_json=USERS_JSON_FILE, documents_json=DOCUMENTS_JSON_FILE):
+    """Create the schema and import the legacy JSON files (once per database)"""
+    global _db_file, _initialized
+    with _init_lock:
+        if _initialized and db_file == _db_file:
+            return
+        _db_file = db_file
+        conn = sqlite3.connect(db_file, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            migrate_json_store(conn, users_json, documents_json)
+        finally:
+            conn.close()
+        _initialized = True
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[STORE] Could not read {path}: {e}")
+        return {}
+
+
+def migrate_json_store(conn, users_json, documents_json):
+    """One-time import of users_data.json / documents_data.json"""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return
+
+    users = _read_json(users_json)
+    documents = _read_json(documents_json)
+    with conn:
+        for email, user in users.items():
+            conn.execute(
+                "INSERT OR IGNORE INTO users (email, username, password, created_at, preferences, ocr_corrections)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (email, user.get('username', email), user.get('password', ''),
+                 user.get('created_at', datetime.now().isoformat()),
+                 json.dumps(user.get('preferences', {})), json.dumps(user.get('ocr_corrections', {}))))
+
+        doc_count = 0
+        for email, docs in documents.items():
+            for doc in docs:
+                doc_id = doc.get('id') or new_document_id()
+                # Old ids were per-second timestamps and can collide
+                while conn.execute("SELECT 1 FROM documents WHERE id = ?", (doc_id,)).fetchone():
+                    doc_id = f"{doc_id}_{uuid.uuid4().hex[:4]}"
+                text = doc.get('text', '')
+                conn.execute(
+                    "INSERT INTO documents (id, user_email, title, text, preview, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (doc_id, email, doc.get('title', 'Untitled'), text,
+                     doc.get('preview', make_preview(text)),
+                     doc.get('created_at', datetime.now().isoformat())))
+                doc_count += 1
+
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                     (datetime.now().isoformat(),))
+    if users or documents:
+        print(f"[STORE] Migrated {len(users)} users and {doc_count} documents from JSON")
+
+
+def _user_from_row(row):
+    if row is None:
+        return None
+    user = dict(row)
+    user['preferences'] = json.loads(user['preferences'])
+    user['ocr_corrections'] = json.loads(user['ocr_corrections'])
+    return user
+
+
+# ===== USERS =====
+
+@STORE_SECONDS.time(operation='get_user')
+def get_user(email):
+    """User record (with decoded preferences), or None"""
+    row = get_connection().execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
+    return _user_from_row(row)
+
+
+@STORE_SECONDS.time(operation='get_latest_user')
+def get_latest_user():
+    """Most recently registered user, or None"""
+    row = get_connection().execute(
+        "SELECT * FROM users ORDER BY created_at DESC LIMIT 1").fetchone()
+    return _user_from_row(row)
+
+
+@STORE_SECONDS.time(operation='create_user')
+def create_user(email, username, password, preferences):
+    """Insert a new user; returns False if the email is already registered"""
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO users (email, username, password, created_at, preferences)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (email, username, password, datetime.now().isoformat(), json.dumps(preferences)))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+
+@STORE_SECONDS.time(operation='update_preferences')
+def update_preferences(email, preferences):
+    """Replace a user's preferences; returns False if the user doesn't exist"""
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("UPDATE users SET preferences = ? WHERE email = ?",
+                           (json.dumps(preferences), email))
+    return cur.rowcount > 0
+
+
+@STORE_SECONDS.time(operation='add_ocr_corrections')
+def add_ocr_corrections(email, corrections):
+    """Merge corrections into the user's own list; returns the result or None if no such user"""
+    conn = get_connection()
+    with conn:
+        row = conn.execute("SELECT ocr_corrections FROM users WHERE email = ?", (email,)).fetchone()
+        if row is None:
+            return None
+        merged = json.loads(row['ocr_corrections'])
+        merged.update(corrections)
+        conn.execute("UPDATE users SET ocr_corrections = ? WHERE email = ?",
+                     (json.dumps(merged), email))
+    return merged
+
+
+# ===== DOCUMENTS =====
+
+def new_document_id():
+    """Sortable, collision-free document id"""
+    return f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def make_preview(text):
+    return text[:PREVIEW_LENGTH] + ('...' if len(text) > PREVIEW_LENGTH else '')
+
+
+@STORE_SECONDS.time(operation='add_document')
+def add_document(user_email, title, text):
+    """Store a processed document and return its id"""
+    doc_id = new_document_id()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO documents (id, user_email, title, text, preview, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (doc_id, user_email, title, text, make_preview(text), datetime.now().isoformat()))
+    return doc_id
+
+
+@STORE_SECONDS.time(operation='get_document')
+def get_document(user_email, doc_id):
+    """Full document (including text) owned by user_email, or None"""
+    row = get_connection().execute(
+        "SELECT * FROM documents WHERE id = ? AND user_email = ?", (doc_id, user_email)).fetchone()
+    return dict(row) if row else None
+
+
+@STORE_SECONDS.time(operation='list_documents')
+def list_documents(user_email, limit=None, offset=0, sort='newest'):
+    """
+    One page of the user's document metadata (id, title, preview, created_at).
+    Text bodies are never read; use get_document for those.
+    """
+    order_by = DOCUMENT_SORTS.get(sort, DOCUMENT_SORTS['newest'])
+    rows = get_connection().execute(
+        f"SELECT id, title, preview, created_at FROM documents"
+        f" WHERE user_email = ? ORDER BY {order_by} LIMIT ? OFFSET ?",
+        (user_email, -1 if limit is None else limit, offset)).fetchall()
+    return [dict(row) for row in rows]
+
+
+@STORE_SECONDS.time(operation='count_documents')
+def count_documents(user_email):
+    """Number of documents the user has"""
+    return get_connection().execute(
+        "SELECT COUNT(*) FROM documents WHERE user_email = ?", (user_email,)).fetchone()[0]
+
+
+@STORE_SECONDS.time(operation='delete_document')
+def delete_document(user_email, doc_id):
+    """Delete a document; returns True if something was deleted"""
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("DELETE FROM documents WHERE id = ? AND user_email = ?",
+                           (doc_id, user_email))
+    return cur.rowcount > 0
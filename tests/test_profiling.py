@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import tracemalloc
+
+import pytest
+
+from profiling_module import profiling_module
+from profiling_module.profiling_module import Profile
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _busy():
+    return sum(i * i for i in range(20000))
+
+
+def test_overlapping_profiles(tmp_path):
+    """Two profiles on different threads: one gets cProfile, both are saved"""
+    first_started = threading.Event()
+    second_done = threading.Event()
+    paths = {}
+
+    def first():
+        profile = Profile('first', profile_dir=str(tmp_path)).start()
+        first_started.set()
+        second_done.wait(10)
+        _busy()
+        paths['first'] = profile.stop()
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert first_started.wait(10)
+    second = Profile('second', profile_dir=str(tmp_path)).start()
+    _busy()
+    paths['second'] = second.stop()
+    second_done.set()
+    thread.join(10)
+
+    first_summary, second_summary = _load(paths['first']), _load(paths['second'])
+    assert first_summary['cprofile'] and first_summary['top_functions']
+    assert os.path.exists(os.path.join(str(tmp_path), first_summary['stats_file']))
+    assert not second_summary['cprofile'] and second_summary['stats_file'] is None
+    assert second_summary['wall_seconds'] > 0
+    assert not tracemalloc.is_tracing()
+
+    # The lock went back with the first profile
+    with Profile('after', profile_dir=str(tmp_path)) as after:
+        _busy()
+    assert after._profiler is not None
+
+
+def test_failed_enable_leaves_no_state(tmp_path, monkeypatch):
+    """A profiler that can't be enabled degrades to timings and frees everything"""
+    def refuse(self):
+        raise ValueError("Another profiling tool is already active")
+    monkeypatch.setattr(profiling_module.cProfile.Profile, 'enable', refuse)
+
+    profile = Profile('refused', profile_dir=str(tmp_path)).start()
+    summary = _load(profile.stop())
+    assert not summary['cprofile']
+    assert getattr(profiling_module._active, 'profile', None) is None
+    assert not profiling_module._cprofile_lock.locked()
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.fixture(autouse=True)
+def _no_leftover_profile():
+    yield
+    assert getattr(profiling_module._active, 'profile', None) is None
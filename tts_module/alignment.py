@@ -0,0 +1,256 @@
+"""
+Word timings for synthesized speech that comes without word boundaries.
+
+The WAV file is decoded block by block into per-frame RMS energy, frames
+are classified as speech or pause, and the words (weighted by length)
+are laid out over speech time only. Long pauses are then matched to the
+boundaries after punctuation, shorter ones to the nearest word boundary,
+and everything in between is interpolated, so the estimate can't drift
+across pauses the way a plain proportional split over the whole
+duration does.
+"""
+
+import wave
+
+import numpy as np
+
+FRAME_SECONDS = 0.01
+READ_BLOCK_FRAMES = 6000  # 60 s of audio per read
+# Gaps shorter than this are part of a word (stop consonants), not a pause
+MIN_PAUSE_SECONDS = 0.05
+# Pauses at least this long are matched to boundaries after punctuation
+LONG_PAUSE_SECONDS = 0.15
+# Matching costs (in units of |log(spoken interval / expected interval)|)
+PAUSE_SKIP_COST = 0.7
+BOUNDARY_SKIP_COST = 0.3
+MAX_SKIPPED_BOUNDARIES = 4
+# Pauses are matched to boundaries at most this many boundaries from their estimate
+MATCH_BAND = 200
+PAUSE_PUNCTUATION = ('.', '!', '?', ':', ';', ',')
+
+
+def word_weights(words):
+    """Relative spoken length of each word (characters plus a rough syllable bonus)"""
+    lengths = np.fromiter((len(w) for w in words), dtype=np.float64, count=len(words))
+    return lengths + np.maximum(1, lengths // 3) * 0.5
+
+
+def wav_frame_energy(path, frame_seconds=FRAME_SECONDS):
+    """
+    RMS energy of each frame_seconds frame of a PCM WAV file (mono mix).
+    Returns (energies, frame_seconds actually used).
+    """
+    with wave.open(path, 'rb') as w:
+        channels = w.getnchannels()
+        width = w.getsampwidth()
+        rate = w.getframerate()
+        if width not in (1, 2, 4):
+            raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+        dtype = {1: np.uint8, 2: '<i2', 4: '<i4'}[width]
+        frame_len = max(1, int(round(rate * frame_seconds)))
+
+        energies = []
+        leftover = np.zeros(0, dtype=np.float32)
+        while True:
+            raw = w.readframes(frame_len * READ_BLOCK_FRAMES)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+            if width == 1:
+                samples -= 128.0
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            samples = np.concatenate((leftover, samples))
+            usable = len(samples) - len(samples) % frame_len
+            frames = samples[:usable].reshape(-1, frame_len)
+            energies.append(np.sqrt(np.mean(frames * frames, axis=1)))
+            leftover = samples[usable:]
+        if len(leftover):
+            energies.append(np.sqrt(np.mean(leftover * leftover, keepdims=True)))
+
+    energy = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+    return energy, frame_len / float(rate)
+
+
+def _runs(mask):
+    """(starts, ends) of the runs of True in a boolean array (ends exclusive)"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def energy_threshold(energy, bins=256):
+    """
+    Speech/pause threshold: Otsu's split of the log-energy histogram, which
+    doesn't assume how much of the audio is pause.
+    """
+    log_energy = np.log10(energy + 1e-3)
+    hist, edges = np.histogram(log_energy, bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    weight_low = np.cumsum(hist)
+    weight_high = weight_low[-1] - weight_low
+    sum_low = np.cumsum(hist * centers)
+    mean_low = sum_low / np.maximum(weight_low, 1)
+    mean_high = (sum_low[-1] - sum_low) / np.maximum(weight_high, 1)
+    between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    return 10 ** edges[np.argmax(between) + 1] - 1e-3
+
+
+def speech_mask(energy, frame_seconds, min_pause_seconds=MIN_PAUSE_SECONDS):
+    """Boolean speech/pause classification of frames, with short gaps filled in"""
+    if not len(energy):
+        return np.zeros(0, dtype=bool)
+    if energy.max() <= 0:
+        return np.zeros(len(energy), dtype=bool)
+    mask = energy > energy_threshold(energy)
+
+    # Fill pauses shorter than min_pause_seconds that sit between two speech runs
+    starts, ends = _runs(~mask)
+    min_frames = max(1, int(round(min_pause_seconds / frame_seconds)))
+    inner = (starts > 0) & (ends < len(mask)) & (ends - starts < min_frames)
+    if inner.any():
+        fill = np.zeros(len(mask) + 1, dtype=np.int32)
+        np.add.at(fill, starts[inner], 1)
+        np.add.at(fill, ends[inner], -1)
+        mask |= np.cumsum(fill[:-1]) > 0
+    return mask
+
+
+def match_pauses(pause_pos, bound_pos, total, max_skip=MAX_SKIPPED_BOUNDARIES, band=MATCH_BAND):
+    """
+    Monotonic matching of pauses to estimated boundaries (both sorted positions
+    in [0, total]) that best agrees on the spacing between consecutive matches.
+    Either side may be skipped at a cost. Dynamic programming over the pauses,
+    vectorized over the boundaries within `band` of each pause's estimate.
+    Returns an array of (pause index, boundary index) pairs.
+    """
+    n_pauses, n_bounds = len(pause_pos), len(bound_pos)
+    eps = 1e-6
+    bound_pos = bound_pos.astype(np.float64)
+    centers = np.searchsorted(bound_pos, pause_pos)
+    lows = np.clip(centers - band, 0, n_bounds)
+    highs = np.clip(centers + band + 1, 0, n_bounds)
+
+    # cost[q]: best cost with the latest matched pause on boundary q;
+    # last[q]: that pause's position (pauses can be skipped in between)
+    cost = np.abs(np.log((pause_pos[0] + eps) / (bound_pos + eps))) + np.arange(n_bounds) * BOUNDARY_SKIP_COST
+    cost[:lows[0]] = np.inf
+    cost[highs[0]:] = np.inf
+    last = np.full(n_bounds, pause_pos[0])
+    steps = []
+    for p in range(1, n_pauses):
+        lo, hi = lows[p], highs[p]
+        # Skip this pause: every state carries over
+        new_cost = cost + PAUSE_SKIP_COST
+        new_last = last.copy()
+        step = np.zeros(hi - lo, dtype=np.int8)
+        for k in range(1, max_skip + 1):
+            q = np.arange(max(lo, k), hi)
+            if not len(q):
+                continue
+            spoken = pause_pos[p] - last[q - k]
+            expected = bound_pos[q] - bound_pos[q - k]
+            candidate = (cost[q - k] + np.abs(np.log((spoken + eps) / (expected + eps)))
+                         + (k - 1) * BOUNDARY_SKIP_COST)
+            better = candidate < new_cost[q]
+            new_cost[q[better]] = candidate[better]
+            new_last[q[better]] = pause_pos[p]
+            step[q[better] - lo] = k
+        steps.append((lo, step))
+        cost, last = new_cost, new_last
+
+    tail = np.abs(np.log((total - last + eps) / (total - bound_pos + eps)))
+    q = int(np.argmin(cost + tail + (n_bounds - 1 - np.arange(n_bounds)) * BOUNDARY_SKIP_COST))
+    pairs = []
+    for p in range(n_pauses - 1, 0, -1):
+        lo, step = steps[p - 1]
+        k = int(step[q - lo]) if lo <= q < lo + len(step) else 0
+        if k:
+            pairs.append((p, q))
+            q -= k
+    pairs.append((0, q))
+    return np.array(pairs[::-1], dtype=np.int64).reshape(-1, 2)
+
+
+def align_words(words, mask, frame_seconds):
+    """
+    WordBoundary-style timings [{'word', 'offset', 'duration'}] for words
+    spoken over the speech frames of mask.
+    """
+    n = len(words)
+    speech_cum = np.cumsum(mask)
+    total_speech = speech_cum[-1] if len(speech_cum) else 0
+    if n == 0 or total_speech == 0:
+        return None
+
+    # Boundaries (in speech frames) between words, proportional to their weights
+    weights = word_weights(words)
+    bounds = np.concatenate(([0.0], np.cumsum(weights))) / weights.sum() * total_speech
+
+    pause_starts, pause_ends = _runs(~mask)
+    inner = (pause_starts > 0) & (pause_ends < len(mask))
+    pause_starts, pause_ends = pause_starts[inner], pause_ends[inner]
+    if len(pause_starts) and n > 1:
+        # Where each pause falls in speech time, and how long it is
+        pause_pos = speech_cum[pause_starts - 1].astype(np.float64)
+        pause_seconds = (pause_ends - pause_starts) * frame_seconds
+        punct = np.fromiter((w.endswith(PAUSE_PUNCTUATION) for w in words[:-1]), dtype=bool, count=n - 1)
+        word_length = total_speech / n
+
+        # 1. Long pauses belong after punctuation. Match them to punctuation
+        #    boundaries as a whole sequence, so one early mismatch can't shift
+        #    every later word
+        punct_index = np.flatnonzero(punct)
+        long_pos = pause_pos[pause_seconds >= LONG_PAUSE_SECONDS]
+        if len(punct_index) and len(long_pos):
+            punct_bounds = bounds[1:-1][punct_index]
+            pairs = match_pauses(long_pos, punct_bounds, float(total_speech))
+            anchors_from = np.concatenate(([0.0], punct_bounds[pairs[:, 1]], [float(total_speech)]))
+            anchors_to = np.concatenate(([0.0], long_pos[pairs[:, 0]], [float(total_speech)]))
+            bounds = np.interp(bounds, anchors_from, anchors_to)
+
+        # 2. With the drift removed, every other pause snaps onto a word boundary
+        #    that is already within half a word of it
+        inner_bounds = bounds[1:-1]
+        right = np.clip(np.searchsorted(inner_bounds, pause_pos), 0, n - 2)
+        left = np.clip(right - 1, 0, n - 2)
+        nearest = np.where(np.abs(inner_bounds[left] - pause_pos) < np.abs(inner_bounds[right] - pause_pos),
+                           left, right)
+        close = np.abs(inner_bounds[nearest] - pause_pos) < 0.5 * word_length
+        # One pause per boundary
+        nearest, snapped = nearest[close], pause_pos[close]
+        unique = np.ones(len(nearest), dtype=bool)
+        unique[1:] = nearest[1:] != nearest[:-1]
+        nearest, snapped = nearest[unique], snapped[unique]
+
+        anchors_from = np.concatenate(([0.0], inner_bounds[nearest], [float(total_speech)]))
+        anchors_to = np.concatenate(([0.0], snapped, [float(total_speech)]))
+        order = np.argsort(anchors_from, kind='stable')
+        anchors_from, anchors_to = anchors_from[order], anchors_to[order]
+        previous_max = np.maximum.accumulate(np.concatenate(([-1.0], anchors_to[:-1])))
+        monotonic = anchors_to > previous_max
+        bounds = np.interp(bounds, anchors_from[monotonic], anchors_to[monotonic])
+
+    # Speech time -> wall frames: a word starts at the first speech frame after
+    # its start boundary and ends after the speech frame that reaches its end
+    starts = np.searchsorted(speech_cum, bounds[:-1], side='right')
+    ends = np.searchsorted(speech_cum, bounds[1:], side='left') + 1
+    ends = np.maximum(ends, starts + 1)
+    offsets = starts * frame_seconds
+    durations = (ends - starts) * frame_seconds
+    return [{'word': word, 'offset': float(offset), 'duration': float(duration)}
+            for word, offset, duration in zip(words, offsets, durations)]
+
+
+def align_wav(text, path):
+    """
+    Word timings for text spoken in the WAV file at path, or None if the
+    audio can't be decoded or holds no detectable speech.
+    """
+    words = text.split()
+    try:
+        energy, frame_seconds = wav_frame_energy(path)
+    except (OSError, EOFError, ValueError, wave.Error) as e:
+        print(f"[TTS] Could not align {path}: {e}")
+        return None
+    return align_words(words, speech_mask(energy, frame_seconds), frame_seconds)
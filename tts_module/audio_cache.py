@@ -0,0 +1,174 @@
+"""
+On-disk cache of synthesized speech.
+
+Audio is keyed by a hash of the text, voice, rate and backend, so
+re-opening a document (or another user opening the same text) is served
+from disk without calling the TTS service again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from config.config import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
+from metrics_module.metrics_module import counter
+
+TTS_CACHE_LOOKUPS = counter('tts_cache_lookups_total', 'Synthesized audio cache lookups', ['result'])
+
+
+class AudioCache:
+    """
+    Stores one audio file plus a JSON manifest (format and word timings)
+    per key. Least recently used keys are evicted once the directory grows
+    past max_bytes (file mtimes are bumped on every hit); all files of a
+    key are evicted together.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> Event set when the synthesis of that key ends; only while one runs
+        self._in_flight = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, text, voice, rate, backend):
+        """Cache key for synthesizing text with a voice and rate on a backend"""
+        settings = json.dumps({
+            'text_sha256': hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            'voice': voice,
+            'rate': rate,
+            'backend': backend,
+        }, sort_keys=True)
+        return hashlib.sha256(settings.encode('utf-8')).hexdigest()
+
+    def claim(self, key):
+        """
+        Claim the synthesis of key, so concurrent requests for the same audio
+        synthesize it once. Returns None if the caller now owns it (and must
+        release(key) when done), else an Event set when the owner releases it.
+        """
+        with self._lock:
+            pending = self._in_flight.get(key)
+            if pending is None:
+                self._in_flight[key] = threading.Event()
+            return pending
+
+    def release(self, key):
+        """End a claimed synthesis, successful or not, and wake the callers waiting on it"""
+        with self._lock:
+            pending = self._in_flight.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    def path_for(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def _manifest_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def temp_path(self, key, ext='mp3'):
+        """Scratch file to synthesize into before put()"""
+        return os.path.join(self.cache_dir, f"{key}.{ext}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def get(self, key, count=True):
+        """
+        The cached artifact for key - {'key', 'audio_path', 'format', 'timings'} -
+        or None on a miss. count=False leaves the hit/miss counters alone
+        (for re-checks of a lookup that was already counted).
+        """
+        manifest_path = self._manifest_path(key)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            audio_path = self.path_for(key, manifest['format'])
+            os.utime(audio_path)
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError):
+            if count:
+                with self._lock:
+                    self.misses += 1
+                TTS_CACHE_LOOKUPS.inc(result='miss')
+            return None
+
+        if count:
+            with self._lock:
+                self.hits += 1
+            TTS_CACHE_LOOKUPS.inc(result='hit')
+        return {'key': key, 'audio_path': audio_path,
+                'format': manifest['format'], 'timings': manifest.get('timings', [])}
+
+    def put(self, key, tmp_audio_path, timings, ext='mp3'):
+        """
+        Move a finished temp audio file into the cache alongside its word timings.
+        The manifest is written last, so a half-written entry is never served.
+        """
+        audio_path = self.path_for(key, ext)
+        os.replace(tmp_audio_path, audio_path)
+
+        manifest_path = self._manifest_path(key)
+        tmp_manifest = f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump({'format': ext, 'timings': timings}, f)
+        os.replace(tmp_manifest, manifest_path)
+
+        self.evict(keep=key)
+        return {'key': key, 'audio_path': audio_path, 'format': ext, 'timings': timings}
+
+    def evict(self, keep=None):
+        """Delete least recently used keys (except keep) until the cache fits max_bytes"""
+        entries = {}
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            key = name.split('.', 1)[0]
+            mtime, size, names = entries.get(key, (0, 0, []))
+            entries[key] = (max(mtime, st.st_mtime), size + st.st_size, names + [name])
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for key, (mtime, size, names) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for name in names:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            total -= size
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Shared cache instance for this process"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AudioCache()
+    return _cache
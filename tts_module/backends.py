@@ -0,0 +1,465 @@
+"""
+Pluggable TTS backends.
+
+Every backend synthesizes text into an audio file and returns its word
+timings. get_backend_chain() lists the configured backends in fallback
+order, each with its own circuit breaker: once a backend keeps failing
+it is skipped outright for a while instead of every request waiting for
+it to time out.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import re
+import signal
+import string
+import threading
+import time
+import wave
+import zlib
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import edge_tts
+import numpy as np
+import pyttsx3
+
+from config.config import (TTS_BACKENDS, TTS_BREAKER_FAILURES, TTS_BREAKER_RESET_SECONDS,
+                           TTS_CHUNK_CHARS, TTS_FIRST_CHUNK_CHARS, TTS_MAX_CONCURRENT_CHUNKS,
+                           TTS_EDGE_CHUNK_TIMEOUT_SECONDS, TTS_SYNTHESIS_TIMEOUT_SECONDS,
+                           TTS_OFFLINE_WORKERS, TTS_OFFLINE_TIMEOUT_SECONDS,
+                           TTS_LOCAL_WPM, TTS_LOCAL_TONES, TTS_LOCAL_LATENCY_SECONDS,
+                           TTS_LOCAL_LATENCY_PER_1K_CHARS, TTS_LOCAL_FAILURE_RATE, TTS_LOCAL_SEED)
+from metrics_module.metrics_module import gauge
+from tts_module.alignment import word_weights
+from tts_module.loop_service import run_coroutine
+
+RATE_RE = re.compile(r'^([+-]?\d+)%$')
+
+TTS_CIRCUIT_OPEN = gauge('tts_circuit_open', '1 while a backend is skipped by its circuit breaker', ['backend'])
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through. After `failures` consecutive failures the
+    circuit opens and calls are refused for `reset_seconds`; then it is
+    half-open and a single trial call decides whether it closes again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failures=TTS_BREAKER_FAILURES, reset_seconds=TTS_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may be attempted now"""
+        with self._lock:
+            if self.state == self.OPEN and time.time() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"[TTS] {self.name} circuit closed")
+            self.state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failures:
+                if self.state != self.OPEN:
+                    print(f"[TTS] {self.name} circuit open for {self.reset_seconds}s")
+                self.state = self.OPEN
+                self._opened_at = time.time()
+
+
+class TTSBackend:
+    """
+    Base class. synthesize() writes `format` audio to outfile and returns
+    word timings [{'word', 'offset', 'duration'}] in seconds, or None if the
+    backend can't report them. Only backends whose audio can be concatenated
+    byte-wise (MP3) set streaming and call on_audio(bytes) while they work.
+    """
+
+    name = None
+    format = None
+    streaming = False
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(self.name)
+
+    def synthesize(self, text, voice, rate, outfile, on_audio=None):
+        raise NotImplementedError
+
+    def warm(self):
+        """Start any slow setup in the background so the first synthesis doesn't pay for it"""
+
+
+# ===== EDGE =====
+
+# Edge TTS returns 24 kHz / 48 kbit/s CBR mono MP3, so duration follows from byte count
+EDGE_MP3_BYTES_PER_SECOND = 48000 / 8
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+
+def split_into_chunks(text, max_chars=TTS_CHUNK_CHARS, first_chunk_chars=TTS_FIRST_CHUNK_CHARS):
+    """
+    Split text on paragraph and sentence boundaries into chunks of at most
+    max_chars (first_chunk_chars for the first one, so playback starts quickly).
+    Sentences longer than the limit are split between words.
+    """
+    pieces = []
+    for paragraph in PARAGRAPH_RE.split(text):
+        for sentence in SENTENCE_END_RE.split(paragraph.strip()):
+            if sentence:
+                pieces.append(sentence)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        limit = first_chunk_chars if not chunks else max_chars
+        if current and len(current) + 1 + len(piece) > limit:
+            chunks.append(current)
+            current = ""
+            limit = max_chars
+        while len(piece) > limit:
+            cut = piece.rfind(' ', 0, limit)
+            if cut <= 0:
+                cut = limit
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(piece[:cut])
+            piece = piece[cut:].lstrip()
+            limit = max_chars
+        current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _edge_stream_chunk(text, voice, rate):
+    audio = bytearray()
+    timings = []
+    comm = edge_tts.Communicate(text, voice, rate=rate)
+    async for chunk in comm.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+        elif chunk["type"] == "WordBoundary":
+            timings.append({
+                'word': chunk['text'],
+                'offset': chunk['offset'] / 10000000,  # 100ns ticks -> seconds
+                'duration': chunk['duration'] / 10000000
+            })
+    return bytes(audio), timings
+
+
+async def _edge_synthesize_chunk(text, voice, rate, semaphore):
+    """Audio bytes and WordBoundary timings (seconds, relative to the chunk) for one chunk"""
+    async with semaphore:
+        # A stalled connection fails this chunk instead of holding the request
+        # until the overall synthesis timeout
+        return await asyncio.wait_for(_edge_stream_chunk(text, voice, rate),
+                                      TTS_EDGE_CHUNK_TIMEOUT_SECONDS)
+
+
+async def edge_synthesize(text, voice, rate, outfile, on_audio=None):
+    """
+    Synthesize text as concurrent chunks (at most TTS_MAX_CONCURRENT_CHUNKS
+    in flight) and write them to outfile in order. on_audio(bytes) is called
+    with each chunk's audio as soon as it and all earlier chunks are done.
+    Returns WordBoundary timings [{'word', 'offset', 'duration'}] offset to
+    the position of their chunk in the joined audio.
+    """
+    semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENT_CHUNKS)
+    tasks = [asyncio.ensure_future(_edge_synthesize_chunk(chunk, voice, rate, semaphore))
+             for chunk in split_into_chunks(text)]
+    timings = []
+    elapsed = 0.0
+    try:
+        with open(outfile, 'wb') as f:
+            for task in tasks:
+                audio, chunk_timings = await task
+                f.write(audio)
+                if on_audio:
+                    on_audio(audio)
+                for timing in chunk_timings:
+                    timing['offset'] += elapsed
+                    timings.append(timing)
+                elapsed += len(audio) / EDGE_MP3_BYTES_PER_SECOND
+    finally:
+        for task in tasks:
+            task.cancel()
+    return timings
+
+
+class EdgeBackend(TTSBackend):
+    """Microsoft Edge online voices (MP3, streamed chunk by chunk)"""
+
+    name = 'edge'
+    format = 'mp3'
+    streaming = True
+
+    def synthesize(self, text, voice, rate, outfile, on_audio=None):
+        return run_coroutine(edge_synthesize(text, voice, rate, outfile, on_audio),
+                             timeout=TTS_SYNTHESIS_TIMEOUT_SECONDS)
+
+
+# ===== PYTTSX3 =====
+
+PYTTSX3_BASE_WPM = 150
+
+# Set in each pool worker by _init_pyttsx3_worker
+_worker_engine = None
+
+
+def _init_pyttsx3_worker(worker_pids):
+    """Pool initializer: report this worker's pid, then start the speech engine once"""
+    global _worker_engine
+    worker_pids.put(os.getpid())
+    _worker_engine = pyttsx3.init()
+
+
+def _pyttsx3_worker_ready():
+    return _worker_engine is not None
+
+
+def _pyttsx3_worker_save(text, outfile, wpm):
+    _worker_engine.setProperty("rate", wpm)
+    _worker_engine.save_to_file(text, outfile)
+    _worker_engine.runAndWait()
+    return outfile
+
+
+def rate_to_wpm(rate, base=PYTTSX3_BASE_WPM):
+    """Edge-style rate ('+25%') as pyttsx3 words per minute"""
+    match = RATE_RE.match(rate or '')
+    percent = int(match.group(1)) if match else 0
+    return max(50, int(base * (1 + percent / 100)))
+
+
+class Pyttsx3Backend(TTSBackend):
+    """
+    Offline system voice (WAV). The engine takes a while to initialize, so it
+    runs in a small pool of worker processes that each initialize it once,
+    started at startup by warm_backends(). A pool with a hung or dead worker
+    is replaced.
+    """
+
+    name = 'pyttsx3'
+    format = 'wav'
+
+    def __init__(self, workers=TTS_OFFLINE_WORKERS):
+        super().__init__()
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # pool -> queue its workers put their pids on as they start
+        self._worker_pids = {}
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                worker_pids = multiprocessing.SimpleQueue()
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=_init_pyttsx3_worker, initargs=(worker_pids,))
+                self._worker_pids[self._pool] = worker_pids
+                # Workers start on demand; one trivial task each starts (and initializes) them all now
+                for _ in range(self.workers):
+                    self._pool.submit(_pyttsx3_worker_ready)
+            return self._pool
+
+    def _discard_pool(self, pool, kill_workers=False):
+        """
+        Replace a broken or hung pool: the next call starts a fresh one.
+        kill_workers for a hung worker, which never finishes on its own,
+        so shutdown() alone would wait on it forever.
+        """
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+            worker_pids = self._worker_pids.pop(pool, None)
+        if worker_pids is None:
+            return
+        # Before shutdown, so the workers are still running and their pids can't have been reused
+        while kill_workers and not worker_pids.empty():
+            try:
+                os.kill(worker_pids.get(), signal.SIGTERM)
+            except OSError:
+                pass
+        worker_pids.close()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def warm(self):
+        self._get_pool()
+
+    def synthesize(self, text, voice, rate, outfile, on_audio=None):
+        pool = self._get_pool()
+        try:
+            pool.submit(_pyttsx3_worker_save, text, outfile, rate_to_wpm(rate)).result(
+                timeout=TTS_OFFLINE_TIMEOUT_SECONDS)
+        except BrokenProcessPool:
+            # A worker died (e.g. the speech driver crashed); the pool has stopped the others
+            self._discard_pool(pool)
+            raise
+        except FutureTimeoutError:
+            # The worker is stuck in the speech driver and would keep its slot forever
+            print(f"[TTS] pyttsx3 worker timed out after {TTS_OFFLINE_TIMEOUT_SECONDS}s, restarting the pool")
+            self._discard_pool(pool, kill_workers=True)
+            raise
+        return None
+
+
+# ===== LOCAL STAND-IN =====
+
+LOCAL_SAMPLE_RATE = 24000
+LOCAL_WORD_GAP_SECONDS = 0.06
+LOCAL_CLAUSE_PAUSE_SECONDS = 0.15
+LOCAL_SENTENCE_PAUSE_SECONDS = 0.35
+LOCAL_FADE_SECONDS = 0.005
+
+
+class LocalBackend(TTSBackend):
+    """
+    Offline stand-in for benchmarks and tests: a tone per word (or silence)
+    paced like speech at the requested rate, with WordBoundary-style timings.
+    TTS_LOCAL_LATENCY_* adds artificial latency and TTS_LOCAL_FAILURE_RATE
+    makes that share of calls fail (drawn from a seeded generator, so runs
+    are reproducible).
+    """
+
+    name = 'local'
+    format = 'wav'
+
+    def __init__(self, wpm=TTS_LOCAL_WPM, tones=TTS_LOCAL_TONES, latency=TTS_LOCAL_LATENCY_SECONDS,
+                 latency_per_1k_chars=TTS_LOCAL_LATENCY_PER_1K_CHARS,
+                 failure_rate=TTS_LOCAL_FAILURE_RATE, seed=TTS_LOCAL_SEED):
+        super().__init__()
+        self.wpm = wpm
+        self.tones = tones
+        self.latency = latency
+        self.latency_per_1k_chars = latency_per_1k_chars
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _segment(self, seconds, frequency=None, cache=None):
+        samples = int(round(seconds * LOCAL_SAMPLE_RATE))
+        if frequency is None or not self.tones:
+            return np.zeros(samples, dtype=np.int16)
+        if cache is not None and (samples, frequency) in cache:
+            return cache[samples, frequency]
+        t = np.arange(samples) / LOCAL_SAMPLE_RATE
+        wave_form = 0.3 * np.sin(2 * np.pi * frequency * t)
+        fade = min(samples // 2, int(LOCAL_FADE_SECONDS * LOCAL_SAMPLE_RATE))
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade)
+            wave_form[:fade] *= ramp
+            wave_form[-fade:] *= ramp[::-1]
+        segment = (wave_form * 32767).astype(np.int16)
+        if cache is not None:
+            cache[samples, frequency] = segment
+        return segment
+
+    def synthesize(self, text, voice, rate, outfile, on_audio=None):
+        with self._random_lock:
+            fail = self._random.random() < self.failure_rate
+        delay = self.latency + len(text) / 1000 * self.latency_per_1k_chars
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("Injected local TTS failure")
+
+        # Average word (weight ~5.5) plus its gap takes 60 / wpm seconds
+        wpm = rate_to_wpm(rate, base=self.wpm)
+        seconds_per_weight = max(0.01, 60.0 / wpm - LOCAL_WORD_GAP_SECONDS) / 5.5
+        base_frequency = 140 + zlib.crc32((voice or '').encode('utf-8')) % 80
+
+        tokens = [(token, token.strip(string.punctuation)) for token in text.split()]
+        tokens = [(token, word) for token, word in tokens if word]
+        # The aligner's length model, so stand-in pacing and alignment agree
+        weights = word_weights([word for _, word in tokens])
+
+        segments = []
+        tones = {}  # words repeat, and so do their (length, pitch) tones
+        timings = []
+        offset = 0.0
+        for (token, word), weight in zip(tokens, weights):
+            duration = float(weight) * seconds_per_weight
+            frequency = base_frequency + 20 * (zlib.crc32(word.lower().encode('utf-8')) % 5)
+            segments.append(self._segment(duration, frequency, tones))
+            timings.append({'word': word, 'offset': offset, 'duration': duration})
+
+            pause = LOCAL_WORD_GAP_SECONDS
+            if token[-1] in '.!?':
+                pause += LOCAL_SENTENCE_PAUSE_SECONDS
+            elif token[-1] in ',;:':
+                pause += LOCAL_CLAUSE_PAUSE_SECONDS
+            segments.append(self._segment(pause))
+            offset += duration + pause
+
+        audio = np.concatenate(segments) if segments else np.zeros(0, dtype=np.int16)
+        with wave.open(outfile, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(LOCAL_SAMPLE_RATE)
+            w.writeframes(audio.astype('<i2').tobytes())
+        return timings
+
+
+BACKEND_CLASSES = {
+    EdgeBackend.name: EdgeBackend,
+    Pyttsx3Backend.name: Pyttsx3Backend,
+    LocalBackend.name: LocalBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name):
+    """Shared instance of a backend (so its breaker and pool are per process)"""
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name not in BACKEND_CLASSES:
+                raise ValueError(f"Unknown TTS backend: {name}")
+            backend = BACKEND_CLASSES[name]()
+            _backends[name] = backend
+            TTS_CIRCUIT_OPEN.set_function(lambda breaker=backend.breaker: int(breaker.state == breaker.OPEN),
+                                          backend=name)
+        return backend
+
+
+def get_backend_chain():
+    """Configured backends in fallback order"""
+    return [get_backend(name) for name in TTS_BACKENDS]
+
+
+def warm_backends():
+    """Do the configured backends' slow setup (e.g. the offline voice's worker pool) now"""
+    for backend in get_backend_chain():
+        backend.warm()
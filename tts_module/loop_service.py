@@ -0,0 +1,70 @@
+"""
+Long-lived asyncio event loop for TTS.
+
+Flask handlers are synchronous, so instead of creating and tearing down
+a loop with asyncio.run() per request, coroutines are submitted to one
+loop running on a daemon thread. Concurrent synthesis requests then
+share that loop (and its connections) and callers wait with a timeout.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+
+class EventLoopService:
+    """Runs an asyncio loop forever on a background thread"""
+
+    def __init__(self, name='tts-loop'):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro):
+        """Schedule coro on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro, timeout=None):
+        """Run coro on the loop and wait for its result (TimeoutError after timeout seconds)"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"TTS operation timed out after {timeout}s")
+
+    def _reset_after_fork(self):
+        # The loop thread doesn't exist in a forked child; start a fresh one on demand
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+
+_service = EventLoopService()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_service._reset_after_fork)
+
+
+def run_coroutine(coro, timeout=None):
+    """Run a coroutine on the shared TTS event loop and return its result"""
+    return _service.run(coro, timeout)
@@ -1,38 +1,222 @@
-import asyncio
-import edge_tts
-import pyttsx3
+import os
+import queue
+import threading
+import wave
 import pygame
 import time
 import sys
 from config.config import AUDIO_FILE
+from metrics_module.metrics_module import counter, histogram
+from tts_module.alignment import align_wav
+from tts_module.audio_cache import get_audio_cache
+from tts_module.backends import get_backend_chain, EDGE_MP3_BYTES_PER_SECOND
 
 
-async def edge_save(text, voice, outfile, rate):
-    comm = edge_tts.Communicate(text, voice, rate=rate)
-    await comm.save(outfile)
-    return outfile
+AUDIO_MIMETYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav'}
 
+TTS_SYNTHESIS_SECONDS = histogram('tts_synthesis_seconds',
+                                  'Time to synthesize a text and its word timings', ['backend'])
+TTS_CHARACTERS = counter('tts_characters_total', 'Characters of text synthesized', ['backend'])
+TTS_AUDIO_BYTES = counter('tts_audio_bytes_total', 'Bytes of audio synthesized', ['backend'])
+TTS_ERRORS = counter('tts_errors_total', 'Failed synthesis attempts', ['backend'])
 
-def pyttsx3_save(text, outfile):
-    engine = pyttsx3.init()
-    engine.setProperty("rate", 150)
-    engine.save_to_file(text, outfile)
-    engine.runAndWait()
-    return outfile
+
+def audio_duration(path, fmt):
+    """Length of a synthesized audio file in seconds"""
+    if fmt == 'wav':
+        with wave.open(path, 'rb') as w:
+            return w.getnframes() / float(w.getframerate())
+    return os.path.getsize(path) / EDGE_MP3_BYTES_PER_SECOND
+
+
+def word_timings_for_audio(text, path, fmt):
+    """Timings for audio synthesized without word boundaries: aligned to a WAV, else estimated"""
+    if fmt == 'wav':
+        timings = align_wav(text, path)
+        if timings is not None:
+            return timings
+    return estimate_word_timings(text, audio_duration(path, fmt))
+
+
+def estimate_word_timings(text, total_duration):
+    """WordBoundary-style timings spread over total_duration by word length"""
+    words = text.split()
+    ends = compute_word_timings(text, total_duration)
+    timings = []
+    start = 0.0
+    for word, end in zip(words, ends):
+        timings.append({'word': word, 'offset': start, 'duration': end - start})
+        start = end
+    return timings
+
+
+def _artifact_key(cache, backend, text, voice, rate):
+    return cache.make_key(text, voice, rate, backend.name)
+
+
+def tts_artifact_key(text, voice, rate):
+    """Stable, content-addressed id of the primary backend's artifact for text/voice/rate"""
+    return _artifact_key(get_audio_cache(), get_backend_chain()[0], text, voice, rate)
+
+
+def get_cached_tts_artifact(text, voice, rate):
+    """
+    The cached artifact get_tts_artifact would return right now, or None if
+    it would have to synthesize. Fallback artifacts are only served while
+    the backends before them are unavailable.
+    """
+    cache = get_audio_cache()
+    for backend in get_backend_chain():
+        artifact = cache.get(_artifact_key(cache, backend, text, voice, rate))
+        if artifact is not None:
+            return artifact
+        if backend.breaker.state != backend.breaker.OPEN:
+            return None
+    return None
+
+
+def _lookup_or_claim(cache, key):
+    """
+    The cached artifact for key, or None once this caller has claimed its
+    synthesis (see AudioCache.claim). Waits while another caller synthesizes
+    the same key; callers of other keys never wait on each other.
+    """
+    while True:
+        artifact = cache.get(key, count=False)
+        if artifact is not None:
+            return artifact
+        pending = cache.claim(key)
+        if pending is None:
+            # It may have been cached between the lookup and the claim
+            artifact = cache.get(key, count=False)
+            if artifact is not None:
+                cache.release(key)
+            return artifact
+        # Re-check once the owner is done; if it failed, this caller takes over
+        pending.wait()
+
+
+def get_tts_artifact(text, voice, rate, on_audio=None):
+    """
+    Audio and word timings for text, synthesized together on a cache miss by
+    the first backend in the chain that is available and succeeds.
+    on_audio(bytes, format) receives the audio in order while a streaming
+    backend synthesizes it (it is not called on a cache hit).
+    Returns {'key', 'audio_path', 'format', 'timings'}.
+    """
+    cache = get_audio_cache()
+    errors = []
+    for backend in get_backend_chain():
+        key = _artifact_key(cache, backend, text, voice, rate)
+        artifact = _lookup_or_claim(cache, key)
+        if artifact is not None:
+            print(f"[TTS] Audio cache hit: {key[:12]}")
+            return artifact
+
+        try:
+            if not backend.breaker.allow():
+                print(f"[TTS] Skipping {backend.name}: circuit open")
+                continue
+
+            streamed = []
+
+            def backend_on_audio(audio, fmt=backend.format):
+                streamed.append(True)
+                on_audio(audio, fmt)
+
+            tmp_path = cache.temp_path(key, backend.format)
+            try:
+                with TTS_SYNTHESIS_SECONDS.time(backend=backend.name):
+                    timings = backend.synthesize(text, voice, rate, tmp_path,
+                                                 backend_on_audio if on_audio and backend.streaming else None)
+                    if timings is None:
+                        timings = word_timings_for_audio(text, tmp_path, backend.format)
+                backend.breaker.record_success()
+                TTS_CHARACTERS.inc(len(text), backend=backend.name)
+                TTS_AUDIO_BYTES.inc(os.path.getsize(tmp_path), backend=backend.name)
+                return cache.put(key, tmp_path, timings, ext=backend.format)
+            except Exception as e:
+                backend.breaker.record_failure()
+                TTS_ERRORS.inc(backend=backend.name)
+                print(f"[TTS] {backend.name} synthesis failed: {str(e)}")
+                if streamed:
+                    # Part of this backend's audio is already out; another format can't follow it
+                    raise
+                errors.append(f"{backend.name}: {e}")
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        finally:
+            cache.release(key)
+    raise RuntimeError("No TTS backend available (" + "; ".join(errors or ["all circuits open"]) + ")")
+
+
+def stream_tts_audio(text, voice, rate, block_size=64 * 1024):
+    """
+    Start synthesizing text on a background thread and return (format, blocks)
+    as soon as the first audio is ready; blocks yields the audio bytes in order
+    as chunks finish. Synthesis completes (and is cached) even if the client
+    goes away early. format is None if synthesis failed.
+    """
+    audio_queue = queue.Queue()
+    done = object()
+
+    def produce():
+        streamed = []
+
+        def on_audio(audio, fmt):
+            streamed.append(True)
+            audio_queue.put((fmt, audio))
+
+        try:
+            artifact = get_tts_artifact(text, voice, rate, on_audio=on_audio)
+            if not streamed:
+                # A non-streaming backend made it, or another request finished it
+                # while we waited on its synthesis
+                with open(artifact['audio_path'], 'rb') as f:
+                    for block in iter(lambda: f.read(block_size), b''):
+                        audio_queue.put((artifact['format'], block))
+        except Exception as e:
+            print(f"[ERROR] Streaming synthesis failed: {str(e)}")
+        finally:
+            audio_queue.put(done)
+
+    threading.Thread(target=produce, name='tts-stream', daemon=True).start()
+    first = audio_queue.get()
+    if first is done:
+        return None, iter(())
+
+    def blocks():
+        item = first
+        while item is not done:
+            yield item[1]
+            item = audio_queue.get()
+
+    return first[0], blocks()
 
 
 def generate_audio_with_fallback(text, voice, rate):
-    try:
-        asyncio.run(edge_save(text, voice, AUDIO_FILE, rate))
-        return AUDIO_FILE, "edge"
-    except Exception as e:
-        print(f"Edge TTS failed: {e}, trying pyttsx3...")
+    """
+    Synthesize text next to AUDIO_FILE with the first backend that works.
+    Returns (audio path, backend name), or (None, None) if all of them failed.
+    """
+    base_path = os.path.splitext(AUDIO_FILE)[0]
+    for backend in get_backend_chain():
+        if not backend.breaker.allow():
+            continue
+        outfile = f"{base_path}.{backend.format}"
         try:
-            pyttsx3_save(text, AUDIO_FILE)
-            return AUDIO_FILE, "pyttsx3"
-        except Exception as e2:
-            print(f"pyttsx3 also failed: {e2}")
-            return None, None
+            with TTS_SYNTHESIS_SECONDS.time(backend=backend.name):
+                backend.synthesize(text, voice, rate, outfile)
+            backend.breaker.record_success()
+            TTS_CHARACTERS.inc(len(text), backend=backend.name)
+            TTS_AUDIO_BYTES.inc(os.path.getsize(outfile), backend=backend.name)
+            return outfile, backend.name
+        except Exception as e:
+            backend.breaker.record_failure()
+            TTS_ERRORS.inc(backend=backend.name)
+            print(f"{backend.name} TTS failed: {e}, trying next backend...")
+    return None, None
 
 
 def compute_word_timings(text, total_duration):
@@ -128,7 +312,12 @@ def play_karaoke(audio_file, text):
             time.sleep(0.1)
         return
     
-    timings = compute_word_timings(text, total_duration)
+    # Advance to the next word when it starts (aligned to the audio for WAV files)
+    if audio_file.lower().endswith('.wav'):
+        aligned = word_timings_for_audio(text, audio_file, 'wav')
+        timings = [t['offset'] for t in aligned[1:]] + [total_duration]
+    else:
+        timings = compute_word_timings(text, total_duration)
     
     print("\n" + "="*80)
     print("🎵 TEXT HIGHLIGHTING MODE - Follow along with the highlighted words!")
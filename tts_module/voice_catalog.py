@@ -0,0 +1,131 @@
+"""
+Cached Edge TTS voice catalogue.
+
+The voice list changes rarely, so it is kept in memory and on disk and
+refreshed in the background once it is older than the TTL. A snapshot
+shipped with the app is used when nothing has been fetched yet (or the
+network is down), so the reader's dropdown never waits on Microsoft.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import edge_tts
+
+from config.config import VOICES_CACHE_FILE, VOICES_SNAPSHOT_FILE, VOICES_TTL_SECONDS, TTS_VOICES_TIMEOUT_SECONDS
+from tts_module.loop_service import run_coroutine
+
+# Don't retry a failed refresh on every request while the network is down
+REFRESH_RETRY_SECONDS = 5 * 60
+
+
+def format_voices(voices):
+    """Dropdown entries for raw Edge voice records"""
+    return [{
+        'value': v['ShortName'],
+        'label': f"{v['ShortName']} - {v.get('LocalName', v['ShortName'])}"
+    } for v in voices]
+
+
+class VoiceCatalog:
+    """In-process + on-disk voice list with TTL and background refresh"""
+
+    def __init__(self, cache_file=VOICES_CACHE_FILE, snapshot_file=VOICES_SNAPSHOT_FILE,
+                 ttl=VOICES_TTL_SECONDS):
+        self.cache_file = cache_file
+        self.snapshot_file = snapshot_file
+        self.ttl = ttl
+        self._voices = None
+        self._etag = None
+        self._fetched_at = 0
+        self._last_attempt = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _set(self, voices, fetched_at):
+        formatted = format_voices(voices)
+        self._voices = formatted
+        self._etag = hashlib.sha256(json.dumps(formatted, sort_keys=True).encode('utf-8')).hexdigest()
+        self._fetched_at = fetched_at
+
+    def _load_file(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['voices'], data.get('fetched_at', 0)
+        except (OSError, ValueError, KeyError):
+            return None, 0
+
+    def _load_initial(self):
+        voices, fetched_at = self._load_file(self.cache_file)
+        if voices is None:
+            voices, fetched_at = self._load_file(self.snapshot_file)
+            fetched_at = 0  # always refresh a snapshot
+        if voices is not None:
+            self._set(voices, fetched_at)
+
+    def refresh(self):
+        """Fetch the live list from Edge and persist it; returns True on success"""
+        try:
+            voices = run_coroutine(edge_tts.list_voices(), timeout=TTS_VOICES_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"[TTS] Voice list refresh failed: {str(e)}")
+            return False
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+        now = time.time()
+        with self._lock:
+            self._set(voices, now)
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': now, 'voices': voices}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            print(f"[TTS] Could not write voice cache: {e}")
+        print(f"[TTS] Voice list refreshed: {len(voices)} voices")
+        return True
+
+    def get(self):
+        """(voices, etag) - never blocks on the network if any list is available"""
+        with self._lock:
+            if self._voices is None:
+                self._load_initial()
+
+            now = time.time()
+            stale = now - self._fetched_at > self.ttl
+            retry_ok = now - self._last_attempt > REFRESH_RETRY_SECONDS
+            start_refresh = stale and retry_ok and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+                self._last_attempt = now
+            have_voices = self._voices is not None
+
+        if start_refresh:
+            if have_voices:
+                threading.Thread(target=self.refresh, name='voice-refresh', daemon=True).start()
+            else:
+                self.refresh()
+
+        with self._lock:
+            return self._voices or [], self._etag
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_voice_catalog():
+    """Shared catalogue for this process"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = VoiceCatalog()
+    return _catalog
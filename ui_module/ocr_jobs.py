@@ -0,0 +1,108 @@
+"""
+Background OCR job queue for the upload route.
+
+Uploads are handed to a small thread pool so request threads return
+immediately; the browser polls the job for page-level progress and the
+resulting doc_id.
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config import OCR_MAX_CONCURRENT_JOBS, OCR_JOB_TTL_SECONDS
+from metrics_module.metrics_module import counter, gauge, histogram
+
+OCR_JOBS = counter('ocr_jobs_total', 'Finished OCR jobs', ['status'])
+OCR_JOBS_ACTIVE = gauge('ocr_jobs_active', 'OCR jobs waiting for a worker (queued) or running', ['status'])
+OCR_JOB_WAIT_SECONDS = histogram('ocr_job_wait_seconds', 'Time OCR jobs spend queued before they start')
+OCR_JOB_RUN_SECONDS = histogram('ocr_job_run_seconds', 'Time OCR jobs spend running', ['status'])
+
+
+class OCRJobQueue:
+    """Runs OCR jobs with bounded concurrency and tracks their progress"""
+
+    def __init__(self, max_workers=OCR_MAX_CONCURRENT_JOBS, ttl=OCR_JOB_TTL_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        for status in ('queued', 'running'):
+            OCR_JOBS_ACTIVE.set_function(lambda status=status: self._count(status), status=status)
+
+    def submit(self, owner, fn, *args):
+        """
+        Queue fn(progress, *args) and return the new job id.
+        fn must return the saved doc_id; progress(done, total) reports pages.
+        """
+        self._expire_finished()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'owner': owner,
+                'status': 'queued',
+                'pages_done': 0,
+                'pages_total': None,
+                'doc_id': None,
+                'message': None,
+                'created_at': time.time(),
+                'finished_at': None,
+            }
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(self, job_id, fn, args):
+        started_at = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['status'] = 'running'
+                OCR_JOB_WAIT_SECONDS.observe(started_at - job['created_at'])
+
+        def progress(done, total):
+            self._update(job_id, pages_done=done, pages_total=total)
+
+        try:
+            doc_id = fn(progress, *args)
+            self._update(job_id, status='done', doc_id=doc_id, finished_at=time.time())
+            status = 'done'
+        except Exception as e:
+            print(f"[ERROR] OCR job {job_id} failed: {str(e)}")
+            traceback.print_exc()
+            self._update(job_id, status='error', message=str(e), finished_at=time.time())
+            status = 'error'
+        OCR_JOBS.inc(status=status)
+        OCR_JOB_RUN_SECONDS.observe(time.time() - started_at, status=status)
+
+    def get(self, job_id, owner=None):
+        """Snapshot of a job, or None if unknown (or owned by someone else)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (owner is not None and job['owner'] != owner):
+                return None
+            return {k: v for k, v in job.items() if k != 'owner'}
+
+    def pending_count(self):
+        """Number of jobs queued or running"""
+        return self._count('queued', 'running')
+
+    def _count(self, *statuses):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] in statuses)
+
+    def _expire_finished(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finished_at'] is not None and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
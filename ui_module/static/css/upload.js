@@ -65,9 +65,10 @@ document.getElementById('fileUploadForm').addEventListener('submit', async (e) =
         const data = await response.json();
         
         if (data.success) {
+            const docId = await waitForJob(data.job_id);
             showAlert('Upload successful! Redirecting to reader...', 'success');
             setTimeout(() => {
-                window.location.href = `/reader/${data.doc_id}`;
+                window.location.href = `/reader/${docId}`;
             }, 1000);
         } else {
             showAlert(data.message || 'Upload failed', 'error');
@@ -78,6 +79,26 @@ document.getElementById('fileUploadForm').addEventListener('submit', async (e) =
     }
 });
 
+// Poll a background OCR job until it finishes; resolves with the new doc_id
+async function waitForJob(jobId) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message || 'Job not found');
+        
+        const job = data.job;
+        if (job.status === 'done') return job.doc_id;
+        if (job.status === 'error') throw new Error(job.message || 'Processing failed');
+        
+        if (job.pages_total) {
+            showAlert(`Processing page ${job.pages_done}/${job.pages_total}...`, 'info');
+        } else {
+            showAlert('Processing...', 'info');
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 // Paste Text Submit
 document.getElementById('pasteTextForm').addEventListener('submit', async (e) => {
     e.preventDefault();
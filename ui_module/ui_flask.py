@@ -3,27 +3,37 @@ Flask Web UI - Complete Working Version
 Connects to all existing modules
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for, send_file
 import os
-import json
 import sys
 from werkzeug.utils import secure_filename
 import base64
-from datetime import datetime
 import webbrowser
 import threading
 import time
 import tempfile
+import uuid
 
 # Get project root
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
+from config.config import (EASYOCR_PRELOAD, DOCUMENTS_PAGE_SIZE, AUDIO_MAX_AGE_SECONDS,
+                           PROFILE_REQUESTS, PROFILE_ADMIN_EMAILS)
+
 # Import existing modules
-from ocr_module.ocr_module import image_path_to_text, pdf_to_text, docx_to_text
+from ocr_module.ocr_module import image_path_to_text, pdf_to_text, docx_to_text, warm_easyocr_reader
 from preprocessing_module.preprocessing_module import preprocess_text
-from tts_module.tts_module import generate_audio_with_fallback
+from tts_module.tts_module import (generate_audio_with_fallback, get_tts_artifact,
+                                   get_cached_tts_artifact, stream_tts_audio, AUDIO_MIMETYPES)
 from user_profiles.user_profiles import load_profile, save_profile
+from tts_module.backends import warm_backends
+from tts_module.voice_catalog import get_voice_catalog
+from ui_module.ocr_jobs import OCRJobQueue
+from storage_module import storage_module as store
+from metrics_module.metrics_module import (CONTENT_TYPE as METRICS_CONTENT_TYPE, counter, histogram,
+                                           render as render_metrics)
+from profiling_module.profiling_module import Profile
 
 # Initialize Flask
 app = Flask(__name__)
@@ -34,43 +44,91 @@ app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'pdf', 'docx', 'bmp',
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Data files
-USERS_FILE = os.path.join(PROJECT_ROOT, 'users_data.json')
-DOCUMENTS_FILE = os.path.join(PROJECT_ROOT, 'documents_data.json')
+ocr_jobs = OCRJobQueue()
 
+# Streamed responses (audio) are timed up to their first byte
+HTTP_REQUEST_SECONDS = histogram('http_request_seconds', 'Time to answer a request', ['endpoint', 'method'])
+HTTP_REQUESTS = counter('http_requests_total', 'Requests answered', ['endpoint', 'method', 'status'])
 
-def load_users():
-    """Load users from JSON"""
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+PROFILE_HEADER = 'X-Profile'
+# Never profiled: scrapes and static files
+UNPROFILED_ENDPOINTS = {'metrics', 'static'}
 
 
-def save_users(users):
-    """Save users to JSON"""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+def get_user_corrections(user_email):
+    """The user's own OCR corrections ({misread: correction})"""
+    user = store.get_user(user_email)
+    return user['ocr_corrections'] if user else {}
 
 
-def load_documents():
-    """Load documents from JSON"""
-    if os.path.exists(DOCUMENTS_FILE):
+def process_upload_job(progress, user_email, filepath, title, ext, handwriting):
+    """Background OCR job: extract, clean and save an uploaded file"""
+    try:
+        print(f"[UI->OCR] Processing: {title}")
+
+        if ext in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
+            raw_text = image_path_to_text(filepath, use_easyocr=handwriting, progress=progress)
+        elif ext == 'pdf':
+            raw_text = pdf_to_text(filepath, use_easyocr=handwriting, progress=progress)
+        elif ext == 'docx':
+            raw_text = docx_to_text(filepath)
+            progress(1, 1)
+        else:
+            raise ValueError('Unsupported file')
+
+        print(f"[OCR] Extracted {len(raw_text)} characters")
+        cleaned_text = preprocess_text(raw_text, get_user_corrections(user_email))
+
+        if not cleaned_text.strip():
+            raise ValueError('No text found')
+
+        doc_id = store.add_document(user_email, title, cleaned_text)
+        print(f"[UI] Document saved: {doc_id}")
+        return doc_id
+    finally:
         try:
-            with open(DOCUMENTS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-
-def save_documents(documents):
-    """Save documents to JSON"""
-    with open(DOCUMENTS_FILE, 'w') as f:
-        json.dump(documents, f, indent=2)
+            os.remove(filepath)
+        except OSError:
+            pass
+
+
+def profiling_requested():
+    """Profile this request: always with PROFILE_REQUESTS, else on an admin's X-Profile header"""
+    if request.endpoint in UNPROFILED_ENDPOINTS:
+        return False
+    if PROFILE_REQUESTS:
+        return True
+    return (request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+            and session.get('user_email') in PROFILE_ADMIN_EMAILS)
+
+
+def upload_job_function():
+    """
+    The OCR job to queue for this request. When the request is profiled the
+    job is too (on its own thread), linked to the request's profile.
+    """
+    if 'profile' not in g:
+        return process_upload_job
+    request_profile_id = g.profile.id
+
+    def profiled_job(progress, user_email, filepath, title, ext, handwriting):
+        with Profile('upload_job', request_profile=request_profile_id, user=user_email,
+                     title=title, ext=ext, handwriting=handwriting) as profile:
+            doc_id = process_upload_job(progress, user_email, filepath, title, ext, handwriting)
+            profile.meta['doc_id'] = doc_id
+            return doc_id
+    return profiled_job
+
+
+def wants_whole_audio(byte_range):
+    """
+    True for no Range header or an open-ended one from the start ("bytes=0-"),
+    which browsers send on the first load of an <audio> source: that can be
+    answered with the whole stream (200) while it is still being synthesized
+    """
+    if byte_range is None:
+        return True
+    return byte_range.units == 'bytes' and byte_range.ranges == [(0, None)]
 
 
 def allowed_file(filename):
@@ -78,6 +136,46 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Labelled by route, not path, so document ids don't each become a series
+    endpoint = request.endpoint or 'unmatched'
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+@app.before_request
+def start_profile():
+    if not profiling_requested():
+        return
+    try:
+        g.profile = Profile(request.endpoint or 'unmatched',
+                            route=request.url_rule.rule if request.url_rule else None,
+                            method=request.method, path=request.path, user=session.get('user_email'),
+                            doc_id=(request.view_args or {}).get('doc_id')).start()
+    except Exception as e:
+        # Like saving one, starting a profile must not fail the request it measures
+        print(f"[PROFILE] Could not profile {request.path}: {e}")
+
+
+@app.after_request
+def finish_profile(response):
+    # Streamed audio is profiled up to its first byte, like the request metrics
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop(status=response.status_code)
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+
 # ===== ROUTES =====
 
 @app.route('/')
@@ -99,8 +197,6 @@ def login():
             
             action = data.get('action')
             
-            users = load_users()
-            
             if action == 'register':
                 username = data.get('username', '').strip()
                 email = data.get('email', '').strip().lower()
@@ -109,22 +205,15 @@ def login():
                 if not username or not email or not password:
                     return jsonify({'success': False, 'message': 'All fields required'}), 400
                 
-                if email in users:
+                created = store.create_user(email, username, password, {
+                    'font_size': 18,
+                    'reading_speed': 1.0,
+                    'highlighting_enabled': True,
+                    'line_spacing': 1.8
+                })
+                if not created:
                     return jsonify({'success': False, 'message': 'Email already registered'}), 400
                 
-                users[email] = {
-                    'email': email,
-                    'username': username,
-                    'password': password,
-                    'created_at': datetime.now().isoformat(),
-                    'preferences': {
-                        'font_size': 18,
-                        'reading_speed': 1.0,
-                        'highlighting_enabled': True,
-                        'line_spacing': 1.8
-                    }
-                }
-                save_users(users)
                 session['user_email'] = email
                 print(f"[UI] New user registered: {username} ({email})")
                 return jsonify({'success': True})
@@ -136,14 +225,15 @@ def login():
                 if not email or not password:
                     return jsonify({'success': False, 'message': 'Email and password required'}), 400
                 
-                if email not in users:
+                user = store.get_user(email)
+                if user is None:
                     return jsonify({'success': False, 'message': 'Account not found'}), 404
                 
-                if users[email].get('password') != password:
+                if user['password'] != password:
                     return jsonify({'success': False, 'message': 'Incorrect password'}), 401
                 
                 session['user_email'] = email
-                print(f"[UI] User logged in: {users[email]['username']} ({email})")
+                print(f"[UI] User logged in: {user['username']} ({email})")
                 return jsonify({'success': True})
             
             else:
@@ -157,15 +247,9 @@ def login():
     
     # GET - show login page
     try:
-        users = load_users()
-        last_user_email = None
-        last_user_name = None
-        
-        if users:
-            sorted_users = sorted(users.items(), key=lambda x: x[1].get('created_at', ''), reverse=True)
-            if sorted_users:
-                last_user_email = sorted_users[0][0]
-                last_user_name = sorted_users[0][1].get('username', last_user_email)
+        last_user = store.get_latest_user()
+        last_user_email = last_user['email'] if last_user else None
+        last_user_name = last_user['username'] if last_user else None
         
         return render_template('login.html', last_user_email=last_user_email, last_user_name=last_user_name)
     except Exception as e:
@@ -177,11 +261,10 @@ def login():
 def quick_login(email):
     """Quick login"""
     email = email.strip().lower()
-    users = load_users()
-    if email in users:
+    user = store.get_user(email)
+    if user is not None:
         session['user_email'] = email
-        username = users[email].get('username', email)
-        print(f"[UI] Quick login: {username}")
+        print(f"[UI] Quick login: {user['username']}")
         return redirect(url_for('upload'))
     return redirect(url_for('login'))
 
@@ -204,74 +287,45 @@ def upload():
         if 'user_email' not in session:
             return redirect(url_for('login'))
         
-        documents = load_documents()
         user_email = session['user_email']
-        user_docs = documents.get(user_email, [])
-        
-        return render_template('upload.html', documents=user_docs, user_email=user_email)
+        sort = request.args.get('sort', 'newest')
+        if sort not in store.DOCUMENT_SORTS:
+            sort = 'newest'
+        total = store.count_documents(user_email)
+        page_count = max(1, -(-total // DOCUMENTS_PAGE_SIZE))
+        page = min(max(request.args.get('page', 1, type=int), 1), page_count)
+        
+        # Metadata only - the full text is loaded when the reader opens
+        user_docs = store.list_documents(user_email, limit=DOCUMENTS_PAGE_SIZE,
+                                         offset=(page - 1) * DOCUMENTS_PAGE_SIZE, sort=sort)
+        
+        return render_template('upload.html', documents=user_docs, user_email=user_email,
+                               page=page, page_count=page_count, total_documents=total, sort=sort)
     
     # POST request - handle upload
     if 'user_email' not in session:
         return jsonify({'success': False, 'message': 'Not logged in'}), 401
     
     try:
-        # File upload
+        user_email = session['user_email']
+
+        # File upload - OCR runs as a background job, client polls /api/jobs/<job_id>
         if 'file' in request.files:
             file = request.files['file']
             if not file.filename or not allowed_file(file.filename):
                 return jsonify({'success': False, 'message': 'Invalid file'}), 400
             
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            ext = filename.rsplit('.', 1)[1].lower()
+            # Unique on-disk name so concurrent uploads of the same file don't collide
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{filename}")
             file.save(filepath)
             
-            print(f"[UI->OCR] Processing: {filename}")
-            
-            ext = filename.rsplit('.', 1)[1].lower()
             handwriting = request.form.get('handwriting', 'false').lower() == 'true'
-            
-            # Extract text
-            if ext in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                raw_text = image_path_to_text(filepath, use_easyocr=handwriting)
-            elif ext == 'pdf':
-                raw_text = pdf_to_text(filepath, use_easyocr=handwriting)
-            elif ext == 'docx':
-                raw_text = docx_to_text(filepath)
-            else:
-                return jsonify({'success': False, 'message': 'Unsupported file'}), 400
-            
-            print(f"[OCR] Extracted {len(raw_text)} characters")
-            cleaned_text = preprocess_text(raw_text)
-            
-            if not cleaned_text.strip():
-                return jsonify({'success': False, 'message': 'No text found'}), 400
-            
-            # Save document
-            doc_id = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            documents = load_documents()
-            user_email = session['user_email']
-            
-            if user_email not in documents:
-                documents[user_email] = []
-            
-            documents[user_email].append({
-                'id': doc_id,
-                'title': filename,
-                'text': cleaned_text,
-                'preview': cleaned_text[:200] + ('...' if len(cleaned_text) > 200 else ''),
-                'created_at': datetime.now().isoformat()
-            })
-            
-            save_documents(documents)
-            print(f"[UI] Document saved: {doc_id}")
-            
-            # Clean up
-            try:
-                os.remove(filepath)
-            except:
-                pass
-            
-            return jsonify({'success': True, 'doc_id': doc_id})
+            job_id = ocr_jobs.submit(user_email, upload_job_function(),
+                                     user_email, filepath, filename, ext, handwriting)
+            print(f"[UI] Queued OCR job {job_id} for {filename}")
+            return jsonify({'success': True, 'job_id': job_id}), 202
         
         # Pasted text or camera image (JSON)
         elif request.is_json:
@@ -283,24 +337,10 @@ def upload():
                 if not text:
                     return jsonify({'success': False, 'message': 'No text provided'}), 400
                 
-                cleaned_text = preprocess_text(text)
-                
-                doc_id = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                documents = load_documents()
-                user_email = session['user_email']
-                
-                if user_email not in documents:
-                    documents[user_email] = []
-                
-                documents[user_email].append({
-                    'id': doc_id,
-                    'title': 'Pasted Text',
-                    'text': cleaned_text,
-                    'preview': cleaned_text[:200],
-                    'created_at': datetime.now().isoformat()
-                })
-                
-                save_documents(documents)
+                cleaned_text = preprocess_text(text, get_user_corrections(user_email))
+                doc_id = store.add_document(user_email, 'Pasted Text', cleaned_text)
+                if 'profile' in g:
+                    g.profile.meta['doc_id'] = doc_id
                 print(f"[UI] Pasted text saved: {doc_id}")
                 return jsonify({'success': True, 'doc_id': doc_id})
             
@@ -310,41 +350,15 @@ def upload():
                 image_data = data['image'].split(',')[1]  # Remove "data:image/jpeg;base64,"
                 image_bytes = base64.b64decode(image_data)
                 
-                # Save to temp file
+                # Save to temp file; the job removes it when done
                 temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
                 temp_file.write(image_bytes)
                 temp_file.close()
                 
-                print(f"[UI->OCR] Processing camera image")
-                
-                # OCR
-                raw_text = image_path_to_text(temp_file.name)
-                os.unlink(temp_file.name)
-                
-                cleaned_text = preprocess_text(raw_text)
-                
-                if not cleaned_text.strip():
-                    return jsonify({'success': False, 'message': 'No text found in image'}), 400
-                
-                # Save
-                doc_id = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                documents = load_documents()
-                user_email = session['user_email']
-                
-                if user_email not in documents:
-                    documents[user_email] = []
-                
-                documents[user_email].append({
-                    'id': doc_id,
-                    'title': 'Camera Scan',
-                    'text': cleaned_text,
-                    'preview': cleaned_text[:200],
-                    'created_at': datetime.now().isoformat()
-                })
-                
-                save_documents(documents)
-                print(f"[UI] Camera scan saved: {doc_id}")
-                return jsonify({'success': True, 'doc_id': doc_id})
+                job_id = ocr_jobs.submit(user_email, upload_job_function(),
+                                         user_email, temp_file.name, 'Camera Scan', 'jpg', False)
+                print(f"[UI] Queued OCR job {job_id} for camera image")
+                return jsonify({'success': True, 'job_id': job_id}), 202
         
         return jsonify({'success': False, 'message': 'Invalid request'}), 400
         
@@ -355,6 +369,19 @@ def upload():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Progress of a background OCR job"""
+    if 'user_email' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    
+    job = ocr_jobs.get(job_id, owner=session['user_email'])
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job})
+
+
 @app.route('/delete/<doc_id>', methods=['DELETE'])
 def delete_document(doc_id):
     """Delete document"""
@@ -362,12 +389,9 @@ def delete_document(doc_id):
         return jsonify({'success': False, 'message': 'Not logged in'}), 401
     
     try:
-        documents = load_documents()
         user_email = session['user_email']
         
-        if user_email in documents:
-            documents[user_email] = [doc for doc in documents[user_email] if doc['id'] != doc_id]
-            save_documents(documents)
+        if store.delete_document(user_email, doc_id):
             print(f"[UI] Document deleted: {doc_id}")
         
         return jsonify({'success': True})
@@ -382,24 +406,16 @@ def reader(doc_id):
     if 'user_email' not in session:
         return redirect(url_for('login'))
     
-    documents = load_documents()
     user_email = session['user_email']
-    user_docs = documents.get(user_email, [])
-    
-    # Find document
-    doc = None
-    for d in user_docs:
-        if d['id'] == doc_id:
-            doc = d
-            break
+    doc = store.get_document(user_email, doc_id)
     
     if not doc:
         return "Document not found", 404
     
     # Get user preferences
-    users = load_users()
-    user_prefs = users.get(user_email, {}).get('preferences', load_profile())
-    username = users.get(user_email, {}).get('username', user_email)
+    user = store.get_user(user_email) or {}
+    user_prefs = user.get('preferences') or load_profile()
+    username = user.get('username', user_email)
     
     return render_template('reader.html', 
                          document=doc, 
@@ -415,15 +431,7 @@ def generate_audio(doc_id):
     
     try:
         # Get document
-        documents = load_documents()
-        user_email = session['user_email']
-        user_docs = documents.get(user_email, [])
-        
-        doc = None
-        for d in user_docs:
-            if d['id'] == doc_id:
-                doc = d
-                break
+        doc = store.get_document(session['user_email'], doc_id)
         
         if not doc:
             return jsonify({'error': 'Document not found'}), 404
@@ -438,32 +446,39 @@ def generate_audio(doc_id):
         
         print(f"[TTS] Generating audio: voice={voice}, rate={rate}")
         
-        # Generate audio using Edge TTS directly
-        import asyncio
-        import edge_tts
-        
-        async def generate_tts():
-            output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-            output_file.close()
-            
-            communicate = edge_tts.Communicate(doc['text'], voice, rate=rate)
-            await communicate.save(output_file.name)
-            
-            return output_file.name
-        
-        audio_path = asyncio.run(generate_tts())
-        
-        print(f"[TTS] Audio generated: {audio_path}")
-        
-        if not audio_path or not os.path.exists(audio_path):
-            return jsonify({'error': 'Audio generation failed'}), 500
-        
-        # Send the audio file
-        return send_file(
-            audio_path,
-            mimetype='audio/mpeg',
-            as_attachment=False
+        artifact = get_cached_tts_artifact(doc['text'], voice, rate)
+        if artifact is None:
+            if wants_whole_audio(request.range):
+                # Not synthesized yet - stream chunks as they are produced (chunked transfer)
+                print(f"[TTS] Streaming audio for {doc_id}")
+                audio_format, blocks = stream_tts_audio(doc['text'], voice, rate)
+                if audio_format is None:
+                    return jsonify({'error': 'Speech synthesis is unavailable right now'}), 503
+                return Response(blocks, mimetype=AUDIO_MIMETYPES[audio_format])
+            # A seek while synthesis is still running: wait for the artifact
+            # and answer with just the requested range
+            artifact = get_tts_artifact(doc['text'], voice, rate)
+        
+        # The artifact is content-addressed, so its key is a strong ETag
+        if request.if_none_match.contains(artifact['key']):
+            response = Response(status=304)
+            response.set_etag(artifact['key'])
+            return response
+        
+        print(f"[TTS] Audio ready: {artifact['audio_path']}")
+        
+        # Send the cached audio file; conditional=True handles Range (206) and If-None-Match (304)
+        response = send_file(
+            artifact['audio_path'],
+            mimetype=AUDIO_MIMETYPES[artifact['format']],
+            as_attachment=False,
+            conditional=True,
+            etag=artifact['key'],
+            max_age=AUDIO_MAX_AGE_SECONDS
         )
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
         
     except Exception as e:
         print(f"[ERROR] Audio generation failed: {str(e)}")
@@ -479,15 +494,7 @@ def get_word_timings(doc_id):
     
     try:
         # Get document
-        documents = load_documents()
-        user_email = session['user_email']
-        user_docs = documents.get(user_email, [])
-        
-        doc = None
-        for d in user_docs:
-            if d['id'] == doc_id:
-                doc = d
-                break
+        doc = store.get_document(session['user_email'], doc_id)
         
         if not doc:
             return jsonify({'error': 'Document not found'}), 404
@@ -498,24 +505,8 @@ def get_word_timings(doc_id):
         
         print(f"[TTS] Generating word timings: voice={voice}, rate={rate}")
         
-        import asyncio
-        import edge_tts
-        
-        async def get_timings():
-            timings = []
-            communicate = edge_tts.Communicate(doc['text'], voice, rate=rate)
-            
-            async for chunk in communicate.stream():
-                if chunk["type"] == "WordBoundary":
-                    timings.append({
-                        'word': chunk['text'],
-                        'offset': chunk['offset'] / 10000000,  # Convert to seconds
-                        'duration': chunk['duration'] / 10000000
-                    })
-            
-            return timings
-        
-        timings = asyncio.run(get_timings())
+        # Same artifact as /api/generate-audio - one synthesis pass serves both
+        timings = get_tts_artifact(doc['text'], voice, rate)['timings']
         
         print(f"[TTS] Generated {len(timings)} word timings")
         
@@ -530,30 +521,49 @@ def get_word_timings(doc_id):
 
 @app.route('/api/edge-voices')
 def get_edge_voices():
-    """Get all available Edge TTS voices"""
+    """Get all available Edge TTS voices (cached; refreshed in the background)"""
     try:
-        import asyncio
-        import edge_tts
+        voice_list, etag = get_voice_catalog().get()
+        
+        if etag and request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify({'voices': voice_list})
+        if etag:
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.max_age = 60 * 60
+        return response
         
-        async def list_voices():
-            voices = await edge_tts.list_voices()
-            return voices
-        
-        voices = asyncio.run(list_voices())
+    except Exception as e:
+        print(f"[ERROR] Failed to get voices: {str(e)}")
+        return jsonify({'voices': []})
+
+@app.route('/api/ocr-corrections', methods=['GET', 'POST'])
+def ocr_corrections():
+    """Get or add the user's own OCR corrections"""
+    if 'user_email' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    
+    user_email = session['user_email']
+    if request.method == 'GET':
+        return jsonify({'success': True, 'corrections': get_user_corrections(user_email)})
+    
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict) or not all(
+                isinstance(k, str) and k.strip() and isinstance(v, str) for k, v in data.items()):
+            return jsonify({'success': False, 'message': 'Expected {"misread": "correction"}'}), 400
         
-        # Format voices for dropdown
-        voice_list = []
-        for v in voices:
-            voice_list.append({
-                'value': v['ShortName'],
-                'label': f"{v['ShortName']} - {v.get('LocalName', v['ShortName'])}"
-            })
+        corrections = store.add_ocr_corrections(user_email, {k.strip(): v for k, v in data.items()})
+        if corrections is None:
+            return jsonify({'success': False, 'message': 'User not found'}), 404
         
-        return jsonify({'voices': voice_list})
+        print(f"[UI] {len(data)} OCR corrections saved for {user_email}")
+        return jsonify({'success': True, 'corrections': corrections})
         
     except Exception as e:
-        print(f"[ERROR] Failed to get voices: {str(e)}")
-        return jsonify({'voices': []})
+        return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/preferences', methods=['GET', 'POST'])
 def preferences():
@@ -564,12 +574,9 @@ def preferences():
     if request.method == 'POST':
         try:
             data = request.get_json()
-            users = load_users()
             user_email = session['user_email']
             
-            if user_email in users:
-                users[user_email]['preferences'] = data
-                save_users(users)
+            if store.update_preferences(user_email, data):
                 print(f"[UI] Preferences saved for {user_email}")
                 return jsonify({'success': True})
             
@@ -579,15 +586,21 @@ def preferences():
             return jsonify({'success': False, 'message': str(e)}), 500
     
     # GET - show preferences page
-    users = load_users()
     user_email = session['user_email']
-    user_prefs = users.get(user_email, {}).get('preferences', load_profile())
+    user = store.get_user(user_email) or {}
+    user_prefs = user.get('preferences') or load_profile()
     
     return render_template('preferences.html', 
                          preferences=user_prefs, 
                          user_email=user_email)
 
 
+@app.route('/metrics')
+def metrics():
+    """Stage metrics in the Prometheus text format"""
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 def open_browser():
     """Open browser after delay"""
     time.sleep(1.5)
@@ -604,6 +617,11 @@ def run_app():
     print("✓ Connected to: OCR, Preprocessing, TTS, User Profiles")
     print("✓ Starting server on http://127.0.0.1:5000")
     
+    if EASYOCR_PRELOAD:
+        warm_easyocr_reader()
+    # e.g. start the offline voice's worker processes before the first Edge outage needs them
+    warm_backends()
+    
     # Start browser in background
     threading.Thread(target=open_browser, daemon=True).start()
     